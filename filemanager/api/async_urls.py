@@ -0,0 +1,16 @@
+from django.urls import path
+
+from .async_views import *
+
+app_name = 'api'
+
+
+# Async views are served by uvicorn workers only (SERVER_MODE=asgi, see run.sh).
+# Under WSGI every request would run them on its own event loop, which breaks streaming responses.
+urlpatterns = [
+
+    # GET methods
+    path('files/file/download/async/', AsyncDownloadFileView.as_view(), name='download-file-async'),
+    path('files/file/status/wait/', WaitFileStatusView.as_view(), name='file-status-wait'),
+    path('files/file/status/events/', FileStatusEventsView.as_view(), name='file-status-events'),
+]
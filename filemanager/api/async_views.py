@@ -0,0 +1,366 @@
+import asyncio
+import configparser
+import datetime
+import json
+import os
+from typing import AsyncIterator, Optional
+
+import httpx
+import redis.exceptions
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBase, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import smart_str
+from django.views import View
+
+from .broker import RedisApi, FILE_STATUS_CHANNEL
+from .minio_api import get_minio_signing_client, get_minio_async_http_client
+from .models import Storage
+from .exceptions import (
+    BaseAPIException,
+    MissingParameter,
+    ObjectIsNotFound,
+    FileHasBeenRemovedFromFS,
+    InappropriateFileStatus,
+    WrongPaginationValue,
+)
+from .utils import ParamsChecker, accepts_encoding, if_range_matches, set_cache_headers, get_not_modified_response
+
+MODE = bool(int(settings.DEBUG))
+
+if MODE:
+    config = configparser.ConfigParser()
+    config.read(settings.BASE_DIR / 'conf.ini')
+    bucket_name = config['MinIO']['BucketName']
+else:
+    bucket_name = os.environ.get('BUCKET_NAME')
+
+
+class AsyncDownloadFileView(View):
+
+    # Native async view, DRF views are sync only. Under ASGI waiting for MinIO and for
+    # a slow client does not hold a worker, so many downloads share one process.
+
+    # Range requests are answered by MinIO itself, headers are passed through in both directions.
+    # Entity tag and modification time of the file replace the ones of the object.
+    forwarded_request_headers = ('Range', 'If-Range')
+    forwarded_response_headers = ('Content-Length', 'Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified')
+
+    async def get(self, request) -> HttpResponseBase:
+
+        try:
+            storage_object = await self.__get_storage_object(request)
+        except BaseAPIException as exc:
+            return JsonResponse({'detail': exc.detail}, status=exc.status_code)
+
+        file_name = str(storage_object.file_uuid) + storage_object.file_extension
+
+        # Compressed object is passed through to clients which accept its encoding and decoded for the others.
+        content_encoding = storage_object.content_encoding
+        passthrough = not content_encoding or accepts_encoding(request, content_encoding)
+        etag = storage_object.get_etag(content_encoding if content_encoding and passthrough else '')
+
+        # Ready files never change, so clients and caches which hold the file are answered without MinIO.
+        if not_modified := get_not_modified_response(
+                request,
+                etag,
+                storage_object.updated_at,
+                settings.DOWNLOAD_CACHE_MAX_AGE,
+        ):
+            return self.__set_vary_headers(not_modified, content_encoding)
+
+        # Signing is a local computation, the object itself is requested by the async client.
+        url = get_minio_signing_client().presigned_get_object(
+            bucket_name,
+            storage_object.object_name,
+            expires=datetime.timedelta(seconds=settings.DOWNLOAD_PRESIGNED_URL_EXPIRES),
+        )
+
+        async_http_client = get_minio_async_http_client()
+
+        try:
+            result = await async_http_client.send(
+                async_http_client.build_request(
+                    'GET',
+                    url,
+                    headers=self.__get_forwarded_headers(request, storage_object, etag),
+                ),
+                stream=True,
+            )
+        except httpx.HTTPError:
+            return JsonResponse({'detail': 'Storage is temporary unavailable.'}, status=503)
+
+        if result.status_code not in (200, 206):
+            await result.aclose()
+            return self.__get_error_response(result)
+
+        response = StreamingHttpResponse(
+            self.__stream(result, passthrough),
+            status=result.status_code,
+            content_type='application/octet-stream',
+        )
+        for header in self.forwarded_response_headers:
+            if header in result.headers:
+                response[header] = result.headers[header]
+        if content_encoding:
+            if passthrough:
+                response['Content-Encoding'] = content_encoding
+            else:
+                response['Content-Length'] = storage_object.blob.size
+            response['Accept-Ranges'] = 'none'
+        response['Content-Disposition'] = f'attachment; filename="{smart_str(file_name)}"'
+
+        set_cache_headers(response, etag, storage_object.updated_at, settings.DOWNLOAD_CACHE_MAX_AGE)
+        return self.__set_vary_headers(response, content_encoding)
+
+    def __get_forwarded_headers(self, request, storage_object: Storage, etag: Optional[str]) -> dict[str, str]:
+
+        # Ranges of the original content can not be mapped onto the compressed object, so the file is sent whole.
+        if storage_object.content_encoding or 'Range' not in request.headers:
+            return {}
+
+        # Files stored before deduplication have no checksum, MinIO checks If-Range against its own tag for them.
+        if etag is None:
+            return {
+                header: request.headers[header]
+                for header in self.forwarded_request_headers if header in request.headers
+            }
+
+        if if_range_matches(request, etag, storage_object.updated_at):
+            return {'Range': request.headers['Range']}
+        return {}
+
+    @staticmethod
+    def __set_vary_headers(response: HttpResponseBase, content_encoding: str) -> HttpResponseBase:
+
+        if content_encoding:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    @staticmethod
+    async def __get_storage_object(request) -> Storage:
+
+        params_checker = ParamsChecker()
+        for key, values in request.GET.lists():
+            for value in values:
+                params_checker(key, value)
+
+        file_uuid = request.GET.get('file_uuid')
+
+        if file_uuid is None:
+            raise MissingParameter(
+                404,
+                'Missing parameter "file_uuid".'
+            )
+
+        try:
+            storage_object = await Storage.objects.select_related('blob').aget(file_uuid=file_uuid)
+        except Storage.DoesNotExist:
+            raise ObjectIsNotFound(
+                404,
+                'Object with uuid %s does not exist.' % file_uuid
+            )
+
+        if await storage_object.userfiles.filter(available=False).aexists():
+            raise FileHasBeenRemovedFromFS(
+                404,
+                'Requested file has been removed from the file system.'
+            )
+
+        if status := {'P': 'in progress', 'E': 'error'}.get(storage_object.status):
+            raise InappropriateFileStatus(
+                404,
+                'File has %s status. Only files with ready status could be downloaded.' % status
+            )
+
+        return storage_object
+
+    @staticmethod
+    def __get_error_response(result: httpx.Response) -> HttpResponseBase:
+
+        match result.status_code:
+            case 416:
+                response = HttpResponse(status=416)
+                if content_range := result.headers.get('Content-Range'):
+                    response['Content-Range'] = content_range
+                return response
+            case 404:
+                return JsonResponse({'detail': 'Requested file has been removed from the file system.'}, status=404)
+            case _:
+                return JsonResponse({'detail': 'Storage is temporary unavailable.'}, status=503)
+
+    @staticmethod
+    async def __stream(result: httpx.Response, raw: bool = True):
+
+        chunks = result.aiter_raw if raw else result.aiter_bytes
+        try:
+            async for chunk in chunks(settings.DOWNLOAD_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await result.aclose()
+
+
+class FileStatusWatcherMixin:
+
+    # Statuses sent by RedisApi.send_message after which the file does not change anymore.
+    # Files which do not exist are reported at once as well, there is nothing to wait for.
+    final_statuses = ('ready', 'error', 'not found')
+    db_statuses = {'R': 'ready', 'E': 'error', 'P': 'in progress'}
+
+    @staticmethod
+    def _get_file_uuids(request) -> list[str]:
+
+        params_checker = ParamsChecker()
+        for key, values in request.GET.lists():
+            for value in values:
+                params_checker(key, value)
+
+        file_uuids = list(dict.fromkeys(request.GET.getlist('file_uuid')))
+
+        if not file_uuids:
+            raise MissingParameter(
+                400,
+                'Missing parameter "file_uuid".'
+            )
+
+        if len(file_uuids) > settings.FILES_BATCH_MAX_UUIDS:
+            raise WrongPaginationValue(
+                400,
+                'Number of requested files must not exceed %s.' % settings.FILES_BATCH_MAX_UUIDS
+            )
+
+        return file_uuids
+
+    async def _watch_statuses(self, file_uuids: list[str], timeout: int) -> AsyncIterator[Optional[tuple[str, str]]]:
+
+        # Yields (file_uuid, status) as soon as a file gets its final status and None
+        # every FILE_STATUS_KEEPALIVE_INTERVAL seconds while waiting for the others.
+        connection = RedisApi.create_async_connection()
+        pubsub = connection.pubsub()
+
+        try:
+            # Channels are subscribed before current statuses are read, so a status sent
+            # in between is either already stored in its key or delivered as a message.
+            await pubsub.subscribe(*(FILE_STATUS_CHANNEL % file_uuid for file_uuid in file_uuids))
+
+            pending = set(file_uuids)
+            for file_uuid, status in (await self.__get_current_statuses(connection, file_uuids)).items():
+                if status not in self.final_statuses:
+                    continue
+                pending.discard(file_uuid)
+                yield file_uuid, status
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while pending and (remaining := deadline - loop.time()) > 0:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=min(settings.FILE_STATUS_KEEPALIVE_INTERVAL, remaining),
+                )
+                if message is None:
+                    yield None
+                    continue
+
+                file_uuid = message['channel'].decode().removeprefix(FILE_STATUS_CHANNEL % '')
+                status = message['data'].decode()
+                if file_uuid in pending and status in self.final_statuses:
+                    pending.discard(file_uuid)
+                    yield file_uuid, status
+        finally:
+            await pubsub.aclose()
+            await connection.aclose()
+
+    async def __get_current_statuses(self, connection, file_uuids: list[str]) -> dict[str, str]:
+
+        statuses = {
+            file_uuid: status.decode()
+            for file_uuid, status in zip(file_uuids, await connection.mget(file_uuids))
+            if status is not None
+        }
+
+        # Keys are set only by the upload pipeline, files which have not reached it yet are looked up in the database.
+        if missing := [file_uuid for file_uuid in file_uuids if file_uuid not in statuses]:
+            async for file_uuid, status in Storage.objects.filter(file_uuid__in=missing).values_list('file_uuid', 'status'):
+                statuses[str(file_uuid)] = self.db_statuses.get(status, status)
+
+        for file_uuid in missing:
+            statuses.setdefault(file_uuid, 'not found')
+
+        return statuses
+
+
+class WaitFileStatusView(FileStatusWatcherMixin, View):
+
+    # Long polling: the response is sent when all files get their final status or FILE_STATUS_WAIT_TIMEOUT expires.
+    # Files which are still being uploaded are returned with "in progress" status and can be requested again.
+
+    async def get(self, request) -> HttpResponseBase:
+
+        try:
+            file_uuids = self._get_file_uuids(request)
+        except BaseAPIException as exc:
+            return JsonResponse({'detail': exc.detail}, status=exc.status_code)
+
+        statuses = dict.fromkeys(file_uuids, 'in progress')
+
+        try:
+            async for update in self._watch_statuses(file_uuids, settings.FILE_STATUS_WAIT_TIMEOUT):
+                if update is not None:
+                    file_uuid, status = update
+                    statuses[file_uuid] = status
+        except redis.exceptions.RedisError:
+            return JsonResponse({'detail': 'Status broker is temporary unavailable.'}, status=503)
+
+        response = JsonResponse({'files': statuses})
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class FileStatusEventsView(FileStatusWatcherMixin, View):
+
+    # Server-Sent Events: every final status is sent as a "status" event as soon as it is published,
+    # "end" event closes the stream. Events are delivered one by one only under ASGI (SERVER_MODE=asgi),
+    # WSGI server has to consume the whole stream before sending it.
+
+    async def get(self, request) -> HttpResponseBase:
+
+        try:
+            file_uuids = self._get_file_uuids(request)
+        except BaseAPIException as exc:
+            return JsonResponse({'detail': exc.detail}, status=exc.status_code)
+
+        response = StreamingHttpResponse(self.__events(file_uuids), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-store'
+        # Proxies must not buffer the stream, otherwise events are delayed until it ends.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def __events(self, file_uuids: list[str]) -> AsyncIterator[str]:
+
+        pending = set(file_uuids)
+
+        try:
+            async for update in self._watch_statuses(file_uuids, settings.FILE_STATUS_EVENTS_TIMEOUT):
+                if update is None:
+                    yield ': keepalive\n\n'
+                    continue
+
+                file_uuid, status = update
+                pending.discard(file_uuid)
+                yield self.__format_event('status', {'file_uuid': file_uuid, 'status': status})
+        except redis.exceptions.RedisError:
+            yield self.__format_event('error', {'detail': 'Status broker is temporary unavailable.'})
+
+        yield self.__format_event('end', {'pending': sorted(pending)})
+
+    @staticmethod
+    def __format_event(event: str, data: dict) -> str:
+
+        return 'event: %s\ndata: %s\n\n' % (event, json.dumps(data))
+
+
+__all__ = (
+    'AsyncDownloadFileView',
+    'WaitFileStatusView',
+    'FileStatusEventsView',
+)
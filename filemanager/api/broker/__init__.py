@@ -1 +1 @@
-from .api import r_client
+from .api import r_client, RedisApi, FILE_STATUS_CHANNEL
@@ -4,6 +4,7 @@ import os
 
 from django.conf import settings
 from redis import Redis
+from redis import asyncio as aioredis
 
 
 MODE = bool(int(settings.DEBUG))
@@ -25,6 +26,9 @@ else:
 
 logger = logging.getLogger('Redis')
 
+# Every status change is also published, so waiting clients are notified instead of polling the key.
+FILE_STATUS_CHANNEL = 'file_status:%s'
+
 
 class RedisApi:
 
@@ -36,11 +40,22 @@ class RedisApi:
             cls._connection = Redis(host=redis_host, port=redis_port, db=redis_db, password=redis_password)
         return cls._connection
 
+    @staticmethod
+    def create_async_connection() -> aioredis.Redis:
+
+        # Async connections are bound to the event loop they have been created in,
+        # so every waiting request opens its own client and has to close it with aclose().
+        return aioredis.Redis(host=redis_host, port=redis_port, db=redis_db, password=redis_password)
+
     @classmethod
     def send_message(cls, msg: str, status: str):
         try:
             connection = cls.get_connection()
-            connection.set(msg, status)
+            # Key is set before publishing, so a client which subscribes first and reads the key next never misses the status.
+            with connection.pipeline(transaction=False) as pipeline:
+                pipeline.set(msg, status)
+                pipeline.publish(FILE_STATUS_CHANNEL % msg, status)
+                pipeline.execute()
         except Exception as e:
             logger.error(f"An error occurred while sending message: {e}")
 
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Iterable, Optional
+
+from django.core.cache import cache
+
+
+logger = logging.getLogger('Cache')
+
+USER_FILES_VERSION_KEY = 'user_files_version:%s'
+STORAGE_OBJECT_VERSION_KEY = 'storage_object_version:%s'
+CACHE_STATS_KEY = 'cache_stats:%s:%s'
+
+
+def _get_version(version_key: str) -> Optional[int]:
+
+    try:
+        return cache.get_or_set(version_key, 1, timeout=None)
+    except Exception as e:
+        logger.error(f"An error occurred while reading cache version: {e}")
+        return None
+
+
+def _bump_versions(version_keys: Iterable[str]) -> None:
+
+    # Every cached value is built with the version in its key,
+    # so incrementing the version makes all of them unreachable at once.
+    for version_key in set(version_keys):
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, 2, timeout=None)
+        except Exception as e:
+            logger.error(f"An error occurred while bumping cache version: {e}")
+
+
+def _incr_counter(stats_key: str, delta: int = 1) -> None:
+
+    try:
+        cache.incr(stats_key, delta)
+    except ValueError:
+        if not cache.add(stats_key, delta, timeout=None):
+            cache.incr(stats_key, delta)
+    except Exception as e:
+        logger.error(f"An error occurred while counting cache lookup: {e}")
+
+
+def _count_lookup(name: str, hit: bool) -> None:
+
+    _incr_counter(CACHE_STATS_KEY % (name, 'hits' if hit else 'misses'))
+
+
+def count_cache_lookup(name: str, hit: bool, served_bytes: int = 0) -> None:
+
+    # Caches which are not built on _get_or_set count their lookups by themselves.
+    _count_lookup(name, hit)
+    if served_bytes:
+        _incr_counter(CACHE_STATS_KEY % (name, 'bytes_served'), served_bytes)
+
+
+def _get_or_set(key: str, name: str, producer: Callable[[], Any], timeout: int) -> Any:
+
+    try:
+        value = cache.get(key)
+    except Exception as e:
+        logger.error(f"An error occurred while reading cache: {e}")
+        return producer()
+
+    _count_lookup(name, value is not None)
+
+    if value is not None:
+        return value
+
+    value = producer()
+
+    try:
+        cache.set(key, value, timeout=timeout)
+    except Exception as e:
+        logger.error(f"An error occurred while writing cache: {e}")
+
+    return value
+
+
+def get_user_files_version(user_id: int) -> Optional[int]:
+
+    return _get_version(USER_FILES_VERSION_KEY % user_id)
+
+
+def bump_user_files_versions(user_ids: Iterable[int]) -> None:
+
+    _bump_versions(USER_FILES_VERSION_KEY % user_id for user_id in user_ids)
+
+
+def bump_storage_object_versions(file_uuids: Iterable[str]) -> None:
+
+    _bump_versions(STORAGE_OBJECT_VERSION_KEY % str(file_uuid).lower() for file_uuid in file_uuids)
+
+
+def make_filters_key(filters: dict[str, Any]) -> str:
+
+    return hashlib.md5(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_or_set_user_files_value(user_id: int, name: str, filters: dict[str, Any], producer: Callable[[], Any], timeout: int) -> Any:
+
+    if (version := get_user_files_version(user_id)) is None:
+        return producer()
+
+    key = 'user_files:%s:%s:%s:%s' % (user_id, version, name, make_filters_key(filters))
+
+    return _get_or_set(key, name, producer, timeout)
+
+
+def get_or_set_storage_object_value(file_uuid: str, name: str, producer: Callable[[], Any], timeout: int) -> Any:
+
+    file_uuid = str(file_uuid).lower()
+
+    if (version := _get_version(STORAGE_OBJECT_VERSION_KEY % file_uuid)) is None:
+        return producer()
+
+    key = 'storage_object:%s:%s:%s' % (file_uuid, version, name)
+
+    return _get_or_set(key, name, producer, timeout)
+
+
+def get_cache_stats(names: Iterable[str]) -> dict[str, dict[str, Any]]:
+
+    names = list(names)
+    stats_keys = [
+        CACHE_STATS_KEY % (name, counter) for name in names for counter in ('hits', 'misses', 'bytes_served')
+    ]
+
+    try:
+        counters = cache.get_many(stats_keys)
+    except Exception as e:
+        logger.error(f"An error occurred while reading cache stats: {e}")
+        counters = {}
+
+    stats = {}
+    for name in names:
+        hits = counters.get(CACHE_STATS_KEY % (name, 'hits'), 0)
+        misses = counters.get(CACHE_STATS_KEY % (name, 'misses'), 0)
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+            'bytes_served': counters.get(CACHE_STATS_KEY % (name, 'bytes_served'), 0),
+        }
+
+    return stats
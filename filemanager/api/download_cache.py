@@ -0,0 +1,213 @@
+import contextlib
+import fcntl
+import logging
+import os
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from django.conf import settings
+from urllib3 import BaseHTTPResponse
+
+from .cache import count_cache_lookup
+
+
+logger = logging.getLogger('Cache')
+
+DOWNLOAD_CACHE_NAME = 'download'
+
+# Fills are coalesced by a fixed set of lock files, so locks never have to be cleaned up.
+# Objects with the same stripe are filled one after another, which is rare and only delays the second fill.
+LOCK_STRIPES = 256
+
+# Partially written files are left behind only by crashed processes.
+STALE_FILL_AGE = 60 * 60
+
+
+class CachedObject:
+
+    # Cached object which is read the same way as MinIO response, so ObjectStream can serve both.
+    # Example of usage:
+    #       StreamingHttpResponse(ObjectStream(CachedObject(path, 'gzip'), 64 * 1024))
+
+    def __init__(self, path: Path, content_encoding: str = '', offset: int = 0, length: int = 0):
+        self._file = open(path, 'rb')
+        self._content_encoding = content_encoding
+
+        size = os.fstat(self._file.fileno()).st_size
+        self._file.seek(offset)
+        self._remaining = min(length, size - offset) if length else size - offset
+
+        self.headers = {'Content-Length': str(self._remaining)}
+        if content_encoding:
+            self.headers['Content-Encoding'] = content_encoding
+
+    @property
+    def size(self) -> int:
+        return int(self.headers['Content-Length'])
+
+    def stream(self, amt: int = 64 * 1024, decode_content: bool = True) -> Iterator[bytes]:
+
+        # Object is cached as it is stored in MinIO, so compressed content is decoded the same way urllib3 does it.
+        decompressor = None
+        if decode_content and self._content_encoding == 'gzip':
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        while self._remaining > 0 and (chunk := self._file.read(min(amt, self._remaining))):
+            self._remaining -= len(chunk)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            if chunk:
+                yield chunk
+
+        if decompressor is not None and (chunk := decompressor.flush()):
+            yield chunk
+
+    def close(self) -> None:
+        self._file.close()
+
+    def release_conn(self) -> None:
+        pass
+
+
+def get_cache_dir() -> Path:
+
+    cache_dir = Path(settings.DOWNLOAD_CACHE_DIR)
+    (cache_dir / 'objects').mkdir(parents=True, exist_ok=True)
+    (cache_dir / 'locks').mkdir(parents=True, exist_ok=True)
+
+    return cache_dir
+
+
+@contextlib.contextmanager
+def _locked(lock_path: Path, blocking: bool = True):
+
+    with open(lock_path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _get_lock_path(cache_dir: Path, object_name: str) -> Path:
+
+    return cache_dir / 'locks' / ('%s.lock' % (zlib.crc32(object_name.encode()) % LOCK_STRIPES))
+
+
+def open_cached_object(
+        object_name: str,
+        size: int,
+        content_encoding: str,
+        fetch: Callable[[], BaseHTTPResponse],
+        offset: int = 0,
+        length: int = 0,
+) -> Optional[CachedObject]:
+
+    # Read-through cache on the local disk. Objects are written once under their name and never change,
+    # so a cached copy is valid for as long as the object exists. None means that the object has to be
+    # read from MinIO directly, either because it is not cacheable or because the cache is not usable.
+    if settings.DOWNLOAD_CACHE_MAX_SIZE <= 0 or size > settings.DOWNLOAD_CACHE_MAX_OBJECT_SIZE:
+        return None
+
+    try:
+        cache_dir = get_cache_dir()
+        path = cache_dir / 'objects' / object_name
+
+        # Concurrent misses wait for the first one, which is the only one to read MinIO.
+        hit = True
+        if not path.exists():
+            with _locked(_get_lock_path(cache_dir, object_name)):
+                if not path.exists():
+                    _fill(path, fetch)
+                    _evict(cache_dir)
+                    hit = False
+
+        cached_object = CachedObject(path, content_encoding, offset, length)
+        os.utime(path)
+    except Exception as e:
+        logger.error(f"An error occurred while reading download cache: {e}")
+        return None
+
+    count_cache_lookup(DOWNLOAD_CACHE_NAME, hit, cached_object.size if hit else 0)
+
+    return cached_object
+
+
+def _fill(path: Path, fetch: Callable[[], BaseHTTPResponse]) -> None:
+
+    # Object is written to a temporary file and renamed, so readers never see a partially written copy.
+    response = fetch()
+    fd, fill_path = tempfile.mkstemp(prefix='.fill-', dir=path.parent)
+
+    try:
+        with os.fdopen(fd, 'wb') as fill_file:
+            for chunk in response.stream(settings.DOWNLOAD_CHUNK_SIZE, decode_content=False):
+                fill_file.write(chunk)
+        os.replace(fill_path, path)
+    except BaseException:
+        _unlink(Path(fill_path))
+        raise
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def _evict(cache_dir: Path) -> None:
+
+    # Least recently used objects are removed first, every hit touches modification time of the object.
+    # Files opened by other requests stay readable until they are closed.
+    with _locked(cache_dir / 'locks' / 'evict.lock', blocking=False) as acquired:
+        if not acquired:
+            return
+
+        entries = []
+        total_size = 0
+        for entry in os.scandir(cache_dir / 'objects'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+
+            if entry.name.startswith('.fill-'):
+                if stat.st_mtime < time.time() - STALE_FILL_AGE:
+                    _unlink(Path(entry.path))
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        for _, size, entry_path in sorted(entries):
+            if total_size <= settings.DOWNLOAD_CACHE_MAX_SIZE:
+                break
+            _unlink(Path(entry_path))
+            total_size -= size
+
+
+def evict_cached_objects(object_names: list[str]) -> None:
+
+    if settings.DOWNLOAD_CACHE_MAX_SIZE <= 0 or not object_names:
+        return
+
+    try:
+        objects_dir = get_cache_dir() / 'objects'
+    except OSError as e:
+        logger.error(f"An error occurred while evicting download cache: {e}")
+        return
+
+    for object_name in object_names:
+        _unlink(objects_dir / object_name)
+
+
+def _unlink(path: Path) -> None:
+
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
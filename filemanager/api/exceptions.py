@@ -47,6 +47,14 @@ class MaxRetriesExceeded(BaseAPIException):
     pass
 
 
+class FileUploadFailed(BaseAPIException):
+    pass
+
+
+class WrongUploadParameters(BaseAPIException):
+    pass
+
+
 class WrongUserIDFormat(BaseAPIException):
     pass
 
@@ -71,6 +79,10 @@ class WrongService(BaseAPIException):
     pass
 
 
+class WrongFlagValue(BaseAPIException):
+    pass
+
+
 __all__ = [
     'InappropriateFileStatus',
     'ObjectIsNotFound',
@@ -78,12 +90,15 @@ __all__ = [
     'DataNotFound',
     'DatabaseErrorUpload',
     'MaxRetriesExceeded',
+    'FileUploadFailed',
+    'WrongUploadParameters',
     'WrongUserIDFormat',
     'WrongUUIDFormat',
     'WrongStatusFormat',
     'WrongFileExtension',
     'WrongPaginationValue',
     'WrongService',
+    'WrongFlagValue',
     'FileHasBeenUnlinked',
     'FileHasBeenRemovedFromFS',
     'FileIsAlreadyUnlinked',
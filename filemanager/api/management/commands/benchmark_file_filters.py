@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Storage, UserStorage
+
+
+class Command(BaseCommand):
+    help = 'Compares query plans and timings of exact and case-insensitive lookups used by the file filters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=100)
+
+    def handle(self, *args, **options):
+
+        storage_object = Storage.objects.order_by('-file_id').first()
+
+        if storage_object is None:
+            raise CommandError('Storage is empty, there is nothing to benchmark.')
+
+        user_file = UserStorage.objects.filter(file_id=storage_object).first()
+        file_uuid = str(storage_object.file_uuid)
+
+        lookups = {
+            'file detail': (
+                Storage.objects.filter(file_uuid=file_uuid),
+                Storage.objects.filter(file_uuid__iexact=file_uuid),
+            ),
+        }
+        if user_file is not None:
+            lookups['user files'] = (
+                UserStorage.objects.filter(
+                    user_id=user_file.user_id,
+                    available=True,
+                    file_extension=storage_object.file_extension,
+                    status=storage_object.status,
+                ),
+                UserStorage.objects.filter(
+                    user_id=user_file.user_id,
+                    available=True,
+                    file_extension__iexact=storage_object.file_extension,
+                    status__iexact=storage_object.status,
+                ),
+            )
+
+        for name, querysets in lookups.items():
+            for lookup, queryset in zip(('exact', 'iexact'), querysets):
+                started_at = time.perf_counter()
+                for _ in range(options['repeat']):
+                    list(queryset.all())
+                elapsed = (time.perf_counter() - started_at) / options['repeat'] * 1000
+
+                self.stdout.write(self.style.MIGRATE_HEADING('%s, %s: %.3f ms per query' % (name, lookup, elapsed)))
+                self.stdout.write(queryset.explain())
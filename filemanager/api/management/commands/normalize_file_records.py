@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from api.models import Storage, UserStorage
+
+
+class Command(BaseCommand):
+    help = 'Lower-cases file extensions and restores canonical service names of records stored before normalization.'
+
+    def handle(self, *args, **options):
+
+        updated = 0
+        with transaction.atomic():
+            for model in (Storage, UserStorage):
+                updated += model.objects.exclude(
+                    file_extension=Lower('file_extension'),
+                ).update(
+                    file_extension=Lower('file_extension'),
+                )
+
+            for service_name in settings.ALLOWED_SERVICE_NAMES:
+                updated += Storage.objects.filter(
+                    service_name__iexact=service_name,
+                ).exclude(
+                    service_name=service_name,
+                ).update(
+                    service_name=service_name,
+                )
+
+        self.stdout.write(self.style.SUCCESS('Normalized %s records.' % updated))
+        if updated:
+            self.stdout.write('Run rebuild_user_file_stats to recount files with normalized extensions.')
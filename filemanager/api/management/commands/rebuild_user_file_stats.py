@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from api.models import UserStorage, UserFileStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds per-user daily counters of available files from the user files table.'\
+           ' Run sync_user_files first for user files created before denormalization,'\
+           ' set FILES_SUMMARY_FROM_STATS afterwards to serve the summary from the counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+
+        stats = UserStorage.objects.filter(
+            available=True,
+            created_at__isnull=False,
+        ).annotate(
+            day=TruncDate('created_at'),
+        ).values(
+            'user_id', 'file_extension', 'status', 'day',
+        ).annotate(
+            files_count=Count('id'),
+        ).order_by()
+
+        # Counters are replaced in one transaction, so the summary never sees a half built table.
+        with transaction.atomic():
+            UserFileStats.objects.all().delete()
+            created = UserFileStats.objects.bulk_create(
+                (
+                    UserFileStats(
+                        user_id=row['user_id'],
+                        file_extension=row['file_extension'],
+                        status=row['status'],
+                        day=row['day'],
+                        count=row['files_count'],
+                    )
+                    for row in stats.iterator()
+                ),
+                batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(self.style.SUCCESS('Rebuilt %s user file counters.' % len(created)))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery, Max
+
+from api.models import Storage, UserStorage
+
+
+class Command(BaseCommand):
+    help = 'Copies status, file extension and timestamps of stored files to the linked user files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+
+        batch_size = options['batch_size']
+        storage_object = Storage.objects.filter(file_id=OuterRef('file_id'))
+
+        last_id = UserStorage.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+
+        updated = 0
+        for start_id in range(0, last_id + 1, batch_size):
+            updated += UserStorage.objects.filter(
+                id__gte=start_id,
+                id__lt=start_id + batch_size,
+            ).update(
+                status=Subquery(storage_object.values('status')[:1]),
+                file_extension=Subquery(storage_object.values('file_extension')[:1]),
+                created_at=Subquery(storage_object.values('created_at')[:1]),
+                updated_at=Subquery(storage_object.values('updated_at')[:1]),
+            )
+
+        self.stdout.write(self.style.SUCCESS('Synchronized %s user files.' % updated))
@@ -9,8 +9,9 @@ def validate_http_get_params(get_response):
 
         nonlocal params_checker
 
-        for key, value in self.request.GET.items():
-            params_checker(key, value)
+        for key, values in self.request.GET.lists():
+            for value in values:
+                params_checker(key, value)
 
         response = get_response(self, *args, **kwargs)
 
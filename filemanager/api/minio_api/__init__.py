@@ -1 +1,10 @@
-from .client import get_minio_client
+from .client import (
+    get_minio_client,
+    get_minio_presign_client,
+    get_minio_signing_client,
+    get_minio_async_http_client,
+    create_multipart_upload,
+    complete_multipart_upload,
+)
+from .buckets import BucketDoesNotExist, ensure_bucket, invalidate_bucket, is_missing_bucket_error
+from .stream import ObjectStream, MultipartRangeStream, ZipArchiveStream
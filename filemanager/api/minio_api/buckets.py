@@ -0,0 +1,43 @@
+import threading
+
+from minio import Minio
+from minio.error import S3Error
+
+
+# Buckets known to exist in current process. Bucket is checked (and created if needed) only once,
+# and forgotten only when MinIO reports that it has gone.
+_ready_buckets: set[str] = set()
+_lock = threading.Lock()
+
+
+class BucketDoesNotExist(Exception):
+    pass
+
+
+def ensure_bucket(minio_client: Minio, bucket_name: str) -> None:
+
+    if bucket_name in _ready_buckets:
+        return
+
+    with _lock:
+        if bucket_name in _ready_buckets:
+            return
+
+        if not minio_client.bucket_exists(bucket_name):
+            try:
+                minio_client.make_bucket(bucket_name)
+            except S3Error as exc:
+                if exc.code not in ('BucketAlreadyOwnedByYou', 'BucketAlreadyExists'):
+                    raise
+
+        _ready_buckets.add(bucket_name)
+
+
+def invalidate_bucket(bucket_name: str) -> None:
+
+    _ready_buckets.discard(bucket_name)
+
+
+def is_missing_bucket_error(exc: Exception) -> bool:
+
+    return isinstance(exc, S3Error) and exc.code == 'NoSuchBucket'
@@ -1,25 +1,184 @@
 import os
+import socket
+import asyncio
+import weakref
+import threading
 import configparser
+from functools import lru_cache
+from typing import Optional
 
+import certifi
+import httpx
+import urllib3
+from urllib3.connection import HTTPConnection
 from django.conf import settings
 
 from minio import Minio
+from minio.datatypes import Part
 
 
 MODE = bool(int(settings.DEBUG))
 
+# Clients are created once per process and share one connection pool between threads.
+# They are dropped after fork, so gunicorn and celery prefork children never share sockets with the parent.
+_lock = threading.Lock()
+_minio_client: Optional[Minio] = None
+_minio_presign_client: Optional[Minio] = None
+_minio_signing_client: Optional[Minio] = None
+
+# Async HTTP clients are bound to the event loop they were created in.
+_async_http_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _reset_clients() -> None:
+    global _lock, _minio_client, _minio_presign_client, _minio_signing_client, _async_http_clients
+
+    _lock = threading.Lock()
+    _minio_client = None
+    _minio_presign_client = None
+    _minio_signing_client = None
+    _async_http_clients = weakref.WeakKeyDictionary()
 
-def get_minio_client() -> Minio:
+
+os.register_at_fork(after_in_child=_reset_clients)
+
+
+@lru_cache(maxsize=1)
+def _get_minio_config() -> dict[str, str]:
 
     if MODE:
         config = configparser.ConfigParser()
         config.read(settings.BASE_DIR / 'conf.ini')
-        minio_host = config['MinIO']['HostURL']
-        access_key = config['MinIO']['AccessKey']
-        secret_key = config['MinIO']['SecretKey']
-    else:
-        minio_host = os.getenv('HOST')
-        access_key = os.getenv('ACCESS_KEY')
-        secret_key = os.getenv('SECRET_KEY')
-
-    return Minio(endpoint=minio_host, access_key=access_key, secret_key=secret_key)
+        return {
+            'host': config['MinIO']['HostURL'],
+            'public_host': config['MinIO'].get('PublicHostURL', config['MinIO']['HostURL']),
+            'region': config['MinIO'].get('Region', 'us-east-1'),
+            'access_key': config['MinIO']['AccessKey'],
+            'secret_key': config['MinIO']['SecretKey'],
+        }
+
+    return {
+        'host': os.getenv('HOST'),
+        'public_host': os.getenv('PUBLIC_HOST', os.getenv('HOST')),
+        'region': os.getenv('MINIO_REGION', 'us-east-1'),
+        'access_key': os.getenv('ACCESS_KEY'),
+        'secret_key': os.getenv('SECRET_KEY'),
+    }
+
+
+def _create_http_client() -> urllib3.PoolManager:
+
+    return urllib3.PoolManager(
+        maxsize=settings.MINIO_POOL_MAXSIZE,
+        timeout=urllib3.Timeout(
+            connect=settings.MINIO_CONNECT_TIMEOUT,
+            read=settings.MINIO_READ_TIMEOUT,
+        ),
+        retries=urllib3.Retry(
+            total=settings.MINIO_MAX_RETRIES,
+            backoff_factor=0.2,
+            status_forcelist=[500, 502, 503, 504],
+        ),
+        socket_options=HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+        cert_reqs='CERT_REQUIRED',
+        ca_certs=os.environ.get('SSL_CERT_FILE') or certifi.where(),
+    )
+
+
+def get_minio_client() -> Minio:
+    global _minio_client
+
+    if _minio_client is None:
+        with _lock:
+            if _minio_client is None:
+                minio_config = _get_minio_config()
+                _minio_client = Minio(
+                    endpoint=minio_config['host'],
+                    access_key=minio_config['access_key'],
+                    secret_key=minio_config['secret_key'],
+                    http_client=_create_http_client(),
+                )
+
+    return _minio_client
+
+
+def get_minio_presign_client() -> Minio:
+    global _minio_presign_client
+
+    # Client is used only to sign URLs handed out to API consumers, so it is bound to the public host.
+    # Region is set explicitly, otherwise Minio asks the server for bucket location before signing.
+    if _minio_presign_client is None:
+        with _lock:
+            if _minio_presign_client is None:
+                minio_config = _get_minio_config()
+                _minio_presign_client = Minio(
+                    endpoint=minio_config['public_host'],
+                    access_key=minio_config['access_key'],
+                    secret_key=minio_config['secret_key'],
+                    region=minio_config['region'],
+                )
+
+    return _minio_presign_client
+
+
+def get_minio_signing_client() -> Minio:
+    global _minio_signing_client
+
+    # Same as presign client, but bound to the internal host. URLs signed by it are requested
+    # by the service itself, e.g. by the async download view.
+    if _minio_signing_client is None:
+        with _lock:
+            if _minio_signing_client is None:
+                minio_config = _get_minio_config()
+                _minio_signing_client = Minio(
+                    endpoint=minio_config['host'],
+                    access_key=minio_config['access_key'],
+                    secret_key=minio_config['secret_key'],
+                    region=minio_config['region'],
+                )
+
+    return _minio_signing_client
+
+
+def get_minio_async_http_client() -> httpx.AsyncClient:
+
+    # Must be called from a coroutine. One client with its own connection pool is kept per event loop.
+    loop = asyncio.get_running_loop()
+
+    if (async_http_client := _async_http_clients.get(loop)) is None:
+        async_http_client = _async_http_clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=settings.MINIO_POOL_MAXSIZE),
+            timeout=httpx.Timeout(
+                settings.MINIO_READ_TIMEOUT,
+                connect=settings.MINIO_CONNECT_TIMEOUT,
+            ),
+            transport=httpx.AsyncHTTPTransport(
+                retries=settings.MINIO_MAX_RETRIES,
+                verify=os.environ.get('SSL_CERT_FILE') or certifi.where(),
+            ),
+        )
+
+    return async_http_client
+
+
+# Multipart upload of a client is driven by presigned URLs, so only its start and end are requested
+# by the service. Public client has no such methods, wrappers keep private API of minio in one place.
+def create_multipart_upload(minio_client: Minio, bucket_name: str, object_name: str) -> str:
+
+    return minio_client._create_multipart_upload(bucket_name, object_name, {})
+
+
+def complete_multipart_upload(
+        minio_client: Minio,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        parts: list[tuple[int, str]],
+) -> None:
+
+    minio_client._complete_multipart_upload(
+        bucket_name,
+        object_name,
+        upload_id,
+        [Part(part_number, etag) for part_number, etag in parts],
+    )
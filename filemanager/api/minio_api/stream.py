@@ -0,0 +1,168 @@
+import datetime
+import io
+import uuid
+import zipfile
+from typing import Callable, Optional
+
+from urllib3 import BaseHTTPResponse
+
+
+class ObjectStream:
+
+    # Iterates over MinIO object data chunk by chunk. Connection is released back
+    # to the pool as soon as data is exhausted or response is closed by Django.
+    # Example of usage:
+    #       StreamingHttpResponse(ObjectStream(minio_client.get_object(...), 64 * 1024))
+    # Objects stored with "Content-Encoding" are decoded unless decode_content is False.
+
+    def __init__(self, response: BaseHTTPResponse, chunk_size: int, decode_content: bool = True):
+        self._response = response
+        self._chunk_size = chunk_size
+        self._decode_content = decode_content
+        self._closed = False
+
+    def __iter__(self):
+        try:
+            yield from self._response.stream(self._chunk_size, decode_content=self._decode_content)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._response.close()
+            self._response.release_conn()
+
+
+class MultipartRangeStream:
+
+    # Builds "multipart/byteranges" body for multiple ranges of a single object.
+    # Ranges are fetched lazily one after another, so only one MinIO response is open at a time.
+
+    def __init__(
+            self,
+            open_range: Callable[[int, int], BaseHTTPResponse],
+            ranges: list[tuple[int, int]],
+            size: int,
+            content_type: str,
+            chunk_size: int,
+    ):
+        self._open_range = open_range
+        self._ranges = ranges
+        self._size = size
+        self._content_type = content_type
+        self._chunk_size = chunk_size
+        self._current = None
+        self.boundary = uuid.uuid4().hex
+
+    def _part_header(self, start: int, end: int) -> bytes:
+        return (
+            '--%s\r\nContent-Type: %s\r\nContent-Range: bytes %s-%s/%s\r\n\r\n' % (
+                self.boundary, self._content_type, start, end, self._size,
+            )
+        ).encode()
+
+    def _closing_boundary(self) -> bytes:
+        return ('--%s--\r\n' % self.boundary).encode()
+
+    @property
+    def content_length(self) -> int:
+        return sum(
+            len(self._part_header(start, end)) + end - start + 1 + 2 for start, end in self._ranges
+        ) + len(self._closing_boundary())
+
+    def __iter__(self):
+        try:
+            for start, end in self._ranges:
+                yield self._part_header(start, end)
+                self._current = ObjectStream(self._open_range(start, end - start + 1), self._chunk_size)
+                yield from self._current
+                yield b'\r\n'
+            yield self._closing_boundary()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._current.close()
+
+
+class _ArchiveBuffer(io.RawIOBase):
+
+    # Write-only buffer which can tell its position but can not seek, so zipfile writes
+    # sizes and checksums after the data of every entry instead of going back for them.
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def pop(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipArchiveStream:
+
+    # Builds ZIP64 archive of several objects on the fly. Objects are read chunk by chunk
+    # one after another, so memory use does not depend on the size of the archive.
+    # Sizes and CRC of an entry are known only after it has been written, so they follow the data
+    # in a data descriptor. Readers accept it only for deflated entries, hence nothing is stored as is.
+    # Example of usage:
+    #       entries = [('file.csv', 'object.csv', updated_at)]
+    #       StreamingHttpResponse(ZipArchiveStream(open_object, entries, 64 * 1024))
+
+    def __init__(
+            self,
+            open_object: Callable[[str], Optional[BaseHTTPResponse]],
+            entries: list[tuple[str, str, datetime.datetime]],
+            chunk_size: int,
+    ):
+        self._open_object = open_object
+        self._entries = entries
+        self._chunk_size = chunk_size
+        self._current = None
+
+    def __iter__(self):
+        buffer = _ArchiveBuffer()
+        try:
+            with zipfile.ZipFile(buffer, mode='w', allowZip64=True) as archive:
+                for arcname, object_name, modified_at in self._entries:
+
+                    # Objects which can not be opened are left out, because the status
+                    # of the response has already been sent.
+                    if (response := self._open_object(object_name)) is None:
+                        continue
+
+                    self._current = ObjectStream(response, self._chunk_size)
+
+                    entry_info = zipfile.ZipInfo(arcname, date_time=modified_at.timetuple()[:6])
+                    entry_info.compress_type = zipfile.ZIP_DEFLATED
+
+                    with archive.open(entry_info, mode='w', force_zip64=True) as entry:
+                        for chunk in self._current:
+                            entry.write(chunk)
+                            if data := buffer.pop():
+                                yield data
+
+                    if data := buffer.pop():
+                        yield data
+
+            yield buffer.pop()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._current.close()
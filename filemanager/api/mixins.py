@@ -1,4 +1,11 @@
-from .models import Storage, UserStorage
+from collections import Counter
+
+from django.db import transaction, Error
+
+from .cache import bump_user_files_versions
+from .models import Storage, UserStorage, UserFileStats
+from .utils import normalize_service_name
+from .exceptions import DatabaseErrorUpload
 
 
 class DeleteFileMixin:
@@ -12,4 +19,76 @@ class DeleteFileMixin:
 
         if not all([item[-1] for item in availabilities]):
             return False
-        return True
\ No newline at end of file
+        return True
+
+
+class CreateFileMixin:
+
+    @staticmethod
+    def _create_file_records(user_id: int, from_service: str, file_uuid: str, file_extension: str) -> Storage:
+
+        with transaction.atomic():
+            try:
+                storage_object = Storage.objects.create(
+                    file_uuid=file_uuid,
+                    file_extension=file_extension,
+                    service_name=from_service,
+                )
+
+                UserStorage.objects.create(
+                    user_id=user_id,
+                    file_id=storage_object,
+                )
+            except Error:
+                raise DatabaseErrorUpload(
+                    507,
+                    'Server is unable to store the representation.'
+                )
+
+        return storage_object
+
+    @staticmethod
+    def _bulk_create_file_records(user_id: int, from_service: str, files: list[tuple[str, str]]) -> list[Storage]:
+
+        # bulk_create skips model save hooks, so values they maintain are filled in here.
+        storage_objects = [
+            Storage(
+                file_uuid=file_uuid,
+                file_extension=file_extension,
+                service_name=normalize_service_name(from_service),
+            )
+            for file_uuid, file_extension in files
+        ]
+
+        with transaction.atomic():
+            try:
+                storage_objects = Storage.objects.bulk_create(storage_objects)
+
+                # Backends which can not return primary keys from bulk insert leave them empty.
+                if any(storage_object.pk is None for storage_object in storage_objects):
+                    storage_objects = list(
+                        Storage.objects.filter(file_uuid__in=[file_uuid for file_uuid, _ in files])
+                    )
+
+                UserStorage.objects.bulk_create(
+                    UserStorage(
+                        user_id=user_id,
+                        file_id=storage_object,
+                        **storage_object._get_denormalized_fields(),
+                    )
+                    for storage_object in storage_objects
+                )
+
+                UserFileStats.apply_deltas(Counter(
+                    UserFileStats.make_key(user_id, storage_object.file_extension, storage_object.status, storage_object.created_at)
+                    for storage_object in storage_objects
+                ))
+            except Error:
+                raise DatabaseErrorUpload(
+                    507,
+                    'Server is unable to store the representation.'
+                )
+
+            transaction.on_commit(lambda: bump_user_files_versions([user_id]))
+
+        return storage_objects
@@ -1,11 +1,62 @@
 import urllib.parse
+from collections import Counter
+from typing import Optional
 
 from django.contrib import admin
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.html import format_html, mark_safe
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.urls import reverse
-from django.db.models import F
+
+from .cache import bump_user_files_versions, bump_storage_object_versions
+from .utils import normalize_file_extension, normalize_service_name
+
+
+class StoredObject(models.Model):
+    checksum = models.CharField(max_length=64, unique=True, verbose_name='Контрольная сумма SHA-256')
+    object_name = models.CharField(max_length=64, unique=True, verbose_name='Имя объекта в хранилище')
+    size = models.BigIntegerField(verbose_name='Размер объекта')
+    content_encoding = models.CharField(max_length=16, blank=True, default='', verbose_name='Сжатие объекта')
+    ref_count = models.PositiveIntegerField(default=0, verbose_name='Количество ссылающихся файлов')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Время создания объекта')
+
+    def __str__(self):
+        return 'Объект %s. Ссылок %s' % (self.object_name, self.ref_count)
+
+    class Meta:
+        verbose_name = 'Объект хранилища'
+        verbose_name_plural = 'Объекты хранилища'
+
+    @classmethod
+    def acquire_existing(cls, checksum: str) -> Optional['StoredObject']:
+
+        # Reference is added by a single UPDATE, so it can not be lost
+        # between reading the object and releasing of its last reference.
+        if cls.objects.filter(checksum=checksum).update(ref_count=models.F('ref_count') + 1):
+            return cls.objects.get(checksum=checksum)
+        return None
+
+    @classmethod
+    def acquire(cls, checksum: str, object_name: str, size: int, content_encoding: str = '') -> 'StoredObject':
+
+        # Object which has been written concurrently with the same content wins,
+        # caller must remove its own object if names differ.
+        if (stored_object := cls.acquire_existing(checksum)) is not None:
+            return stored_object
+
+        try:
+            with transaction.atomic():
+                return cls.objects.create(
+                    checksum=checksum,
+                    object_name=object_name,
+                    size=size,
+                    content_encoding=content_encoding,
+                    ref_count=1,
+                )
+        except IntegrityError:
+            if (stored_object := cls.acquire_existing(checksum)) is not None:
+                return stored_object
+            raise
 
 
 class Storage(models.Model):
@@ -17,7 +68,87 @@ class Storage(models.Model):
     service_name = models.CharField(max_length=15, null=False, verbose_name='Имя сервиса')
     status = models.CharField(max_length=1, choices=STATUSES, default='P', verbose_name='Статус готовности')
     created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Время создания файла')
-    updated_at = models.DateTimeField(auto_now=True, verbose_name='Время последнего изменения файла')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Время последнего изменения файла')
+    blob = models.ForeignKey(
+        StoredObject,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='files',
+        verbose_name='Объект хранилища',
+    )
+
+    @property
+    def object_name(self) -> str:
+        # Files with the same content share one object. Files stored before deduplication
+        # and files uploaded by presigned URLs keep the object named after themselves.
+        if self.blob_id is not None:
+            return self.blob.object_name
+        return str(self.file_uuid) + self.file_extension
+
+    @property
+    def content_encoding(self) -> str:
+        # Size and checksum of the object describe the original content, object itself may be compressed.
+        if self.blob_id is not None:
+            return self.blob.content_encoding
+        return ''
+
+    def get_etag(self, content_encoding: str = '') -> Optional[str]:
+        # Content of the file never changes, so its checksum is a strong entity tag.
+        # Encoded representation differs byte by byte and gets its own tag.
+        if self.blob_id is None:
+            return None
+        return '"%s"' % '-'.join(filter(None, (self.blob.checksum, content_encoding)))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Filters compare with plain equality, so values are stored in their canonical form.
+        self.file_extension = normalize_file_extension(self.file_extension)
+        self.service_name = normalize_service_name(self.service_name)
+
+        adding = self._state.adding
+        loaded_status = getattr(self, '_loaded_status', None)
+        status_changed = loaded_status not in (None, self.status)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Sort and filter keys are copied to linked user files, so listings are served without joining Storage.
+            if not adding:
+                self.userfiles.update(**self._get_denormalized_fields())
+
+            if status_changed:
+                user_files = list(self.userfiles.values_list('user_id', 'available'))
+
+                deltas = Counter()
+                for user_id, available in user_files:
+                    if available:
+                        deltas[UserFileStats.make_key(user_id, self.file_extension, loaded_status, self.created_at)] -= 1
+                        deltas[UserFileStats.make_key(user_id, self.file_extension, self.status, self.created_at)] += 1
+                UserFileStats.apply_deltas(deltas)
+
+                # Status is one of the listing filters, so cached values of every linked user become stale.
+                user_ids = [user_id for user_id, _ in user_files]
+                transaction.on_commit(lambda: bump_user_files_versions(user_ids))
+
+            # Metadata of the file is cached by its uuid and includes the time of the last change.
+            if not adding:
+                transaction.on_commit(lambda: bump_storage_object_versions([self.file_uuid]))
+
+        self._loaded_status = self.status
+
+    def _get_denormalized_fields(self) -> dict:
+        return {
+            'status': self.status,
+            'file_extension': self.file_extension,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
 
     def __str__(self):
         return 'Файл %s%s. Статус %s. Добавлен сервисом %s в %s' % (
@@ -79,7 +210,7 @@ class Storage(models.Model):
 
     @staticmethod
     def __form_url_to_download_file(file_uuid):
-        return reverse('api:download-file') + '?file_uuid=%s' % file_uuid
+        return reverse('api:download-file') + '?file_uuid=%s&redirect=false' % file_uuid
 
 
 class UserStorage(models.Model):
@@ -87,16 +218,142 @@ class UserStorage(models.Model):
     file_id = models.ForeignKey(Storage, on_delete=models.CASCADE, related_name='userfiles', verbose_name='Файл')
     available = models.BooleanField(default=True, null=False, verbose_name='Доступно')
 
+    # Copies of Storage columns maintained by Storage.save(), listing filters and sorts only by them.
+    status = models.CharField(max_length=1, choices=Storage.STATUSES, null=True, editable=False, verbose_name='Статус готовности')
+    file_extension = models.CharField(max_length=6, null=True, editable=False, verbose_name='Расширение файла')
+    created_at = models.DateTimeField(null=True, editable=False, verbose_name='Время создания файла')
+    updated_at = models.DateTimeField(null=True, editable=False, verbose_name='Время последнего изменения файла')
+
     def __str__(self):
         return 'Пользователь %s: %s' % (self.user_id, self.file_id)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_available = instance.__dict__.get('available')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            for field_name, value in self.file_id._get_denormalized_fields().items():
+                setattr(self, field_name, value)
+            delta = 1 if self.available else 0
+        elif (loaded_available := getattr(self, '_loaded_available', None)) is not None:
+            delta = int(self.available) - int(loaded_available)
+        else:
+            delta = 0
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if delta:
+                UserFileStats.apply_deltas(Counter({
+                    UserFileStats.make_key(self.user_id, self.file_extension, self.status, self.created_at): delta,
+                }))
+
+        self._loaded_available = self.available
+        transaction.on_commit(lambda: bump_user_files_versions([self.user_id]))
+
     class Meta:
         verbose_name = 'Файл пользователя'
         verbose_name_plural = 'Файлы пользователя'
-        ordering = (F('file_id__updated_at').desc(),)
+        ordering = ('-updated_at', '-file_id_id')
         constraints = (
             models.UniqueConstraint(
                 fields=['user_id', 'file_id'],
                 name='unique_user__file'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=['user_id', 'available', 'updated_at', 'file_id'],
+                name='user_files__updated_idx'
+            ),
+            models.Index(
+                fields=['user_id', 'available', 'created_at'],
+                name='user_files__created_idx'
+            ),
+        )
+
+
+class UserFileStats(models.Model):
+    user_id = models.IntegerField(verbose_name='Пользователь')
+    file_extension = models.CharField(max_length=6, verbose_name='Расширение файла')
+    status = models.CharField(max_length=1, choices=Storage.STATUSES, verbose_name='Статус готовности')
+    day = models.DateField(verbose_name='День создания файлов')
+    count = models.IntegerField(default=0, verbose_name='Количество доступных файлов')
+
+    def __str__(self):
+        return 'Пользователь %s: %s файлов %s со статусом %s за %s' % (
+            self.user_id,
+            self.count,
+            self.file_extension,
+            self.status,
+            self.day.strftime('%d-%B-%Y'),
+        )
+
+    class Meta:
+        verbose_name = 'Статистика файлов пользователя'
+        verbose_name_plural = 'Статистика файлов пользователей'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user_id', 'day', 'file_extension', 'status'],
+                name='unique_user__day__extension__status'
+            ),
+        )
+
+    @staticmethod
+    def make_key(user_id: int, file_extension: str, status: str, created_at) -> tuple:
+        return user_id, file_extension, status, created_at.date()
+
+    @classmethod
+    def apply_deltas(cls, deltas: Counter) -> None:
+
+        # Must be called inside the transaction which changes the counted rows.
+        for (user_id, file_extension, status, day), delta in deltas.items():
+            if not delta:
+                continue
+
+            stats = cls.objects.filter(user_id=user_id, file_extension=file_extension, status=status, day=day)
+
+            if stats.update(count=models.F('count') + delta):
+                continue
+
+            try:
+                with transaction.atomic():
+                    cls.objects.create(user_id=user_id, file_extension=file_extension, status=status, day=day, count=delta)
+            except IntegrityError:
+                stats.update(count=models.F('count') + delta)
+
+
+def release_stored_objects(file_uuids: list[str]) -> list[str]:
+
+    # Drops references of the files to their objects and returns names of objects
+    # which are not referenced any more and must be removed from the bucket.
+    with transaction.atomic():
+        storage_objects = list(Storage.objects.select_for_update().filter(file_uuid__in=file_uuids))
+
+        released = Counter(storage_object.blob_id for storage_object in storage_objects if storage_object.blob_id)
+        own_object_names = [
+            str(storage_object.file_uuid) + storage_object.file_extension
+            for storage_object in storage_objects if not storage_object.blob_id
+        ]
+
+        Storage.objects.filter(blob__in=released, file_uuid__in=file_uuids).update(blob=None)
+
+        # Rows are locked, so a concurrent upload can not take a reference to an object being removed.
+        list(StoredObject.objects.select_for_update().filter(pk__in=released))
+        for blob_id, references in released.items():
+            StoredObject.objects.filter(pk=blob_id).update(ref_count=models.F('ref_count') - references)
+
+        unreferenced = StoredObject.objects.filter(pk__in=released, ref_count=0)
+        object_names = list(unreferenced.values_list('object_name', flat=True))
+        unreferenced.delete()
+
+        # Object named after a file may have become shared by its duplicates.
+        shared_object_names = set(
+            StoredObject.objects.filter(object_name__in=own_object_names).values_list('object_name', flat=True)
+        )
+        object_names.extend(name for name in own_object_names if name not in shared_object_names)
+
+    return object_names
@@ -7,6 +7,21 @@ class AllowUploadPermission(BasePermission):
         return request.method == 'PUT'
 
 
+class AllowPostPermission(BasePermission):
+
+    def has_permission(self, request, view):
+
+        return request.method == 'POST'
+
+
+class AllowLookupPermission(BasePermission):
+
+    # Lookups do not change anything, POST is allowed only to pass long lists in the body.
+    def has_permission(self, request, view):
+
+        return request.method in ('GET', 'HEAD', 'POST')
+
+
 class AllowDeletePermission(BasePermission):
 
     def has_permission(self, request, view):
@@ -14,4 +29,4 @@ class AllowDeletePermission(BasePermission):
         return request.method == 'DELETE'
 
 
-__all__ = ('AllowUploadPermission', 'AllowDeletePermission')
\ No newline at end of file
+__all__ = ('AllowUploadPermission', 'AllowPostPermission', 'AllowLookupPermission', 'AllowDeletePermission')
\ No newline at end of file
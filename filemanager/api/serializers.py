@@ -41,3 +41,46 @@ class FileSerializer(serializers.ModelSerializer):
             obj.file_id.created_at.strftime('%Y-%m-%d_%H-%M'),
             obj.file_id.file_extension
         )
+
+
+class FileListSerializer(serializers.BaseSerializer):
+
+    # Builds the same representation as FileSerializer from rows fetched with values(),
+    # so the whole page is served by a single query without model instances.
+    # Sort and filter columns are read from the denormalized copies on UserStorage.
+    # Copies stay empty until sync_user_files has run, columns of the joined file are shown instead.
+    denormalized_fields = ('file_extension', 'status', 'created_at', 'updated_at')
+    values_fields = (
+        'file_id',
+        'file_id__service_name',
+        'file_id__file_uuid',
+        *denormalized_fields,
+        *('file_id__%s' % field_name for field_name in denormalized_fields),
+    )
+    statuses = {'P': 'In progress', 'R': 'ready', 'E': 'error'}
+
+    uuid_field = serializers.UUIDField()
+    datetime_field = serializers.DateTimeField()
+
+    def to_representation(self, instance):
+
+        file_extension, status, created_at, updated_at = (
+            instance[field_name] if instance[field_name] is not None else instance['file_id__%s' % field_name]
+            for field_name in self.denormalized_fields
+        )
+
+        return {
+            'file_data': {
+                'service_name': instance['file_id__service_name'],
+                'file_uuid': self.uuid_field.to_representation(instance['file_id__file_uuid']),
+                'file_extension': file_extension,
+                'status': self.statuses.get(status, status),
+                'created_at': self.datetime_field.to_representation(created_at),
+                'updated_at': self.datetime_field.to_representation(updated_at),
+            },
+            'filename': '%s_%s%s' % (
+                instance['file_id__service_name'],
+                created_at.strftime('%Y-%m-%d_%H-%M'),
+                file_extension,
+            ),
+        }
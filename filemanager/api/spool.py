@@ -0,0 +1,134 @@
+import hashlib
+import os
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import BinaryIO
+
+from django.conf import settings
+
+
+class HashingReader:
+
+    # File-like wrapper which calculates SHA-256 and size of everything read through it.
+    # Example of usage:
+    #       reader = HashingReader(file_obj)
+    #       minio_client.put_object(bucket_name, object_name, reader, length)
+    #       reader.hexdigest()
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        self._hash.update(data)
+        self.size += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class CompressingReader:
+
+    # File-like wrapper which gzips everything read from the wrapped object on the fly.
+    # Length of the result is not known in advance, so it is passed to MinIO as -1.
+    # Example of usage:
+    #       reader = HashingReader(file_obj)
+    #       minio_client.put_object(bucket_name, object_name, CompressingReader(reader), -1, part_size=...)
+
+    def __init__(self, fileobj: BinaryIO, level: int = 6):
+        self._fileobj = fileobj
+        # 16 + MAX_WBITS produces gzip container, so the object can be served with "Content-Encoding: gzip".
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._buffer = bytearray()
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            if chunk := self._fileobj.read(settings.UPLOAD_CHUNK_SIZE):
+                self._buffer += self._compressor.compress(chunk)
+            else:
+                self._buffer += self._compressor.flush()
+                self._eof = True
+
+        if size < 0 or size > len(self._buffer):
+            size = len(self._buffer)
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def get_content_encoding(file_extension: str) -> str:
+
+    # Text formats are compressed at rest, office documents and pdf are compressed already.
+    if file_extension.lower() in {extension.lower() for extension in settings.STORAGE_COMPRESSED_EXTENSIONS}:
+        return 'gzip'
+    return ''
+
+
+def wrap_for_storage(reader: BinaryIO, length: int, content_encoding: str) -> tuple[BinaryIO, int, dict]:
+
+    # Returns data, length and headers to be passed to put_object.
+    if content_encoding == 'gzip':
+        return (
+            CompressingReader(reader, settings.STORAGE_COMPRESSION_LEVEL),
+            -1,
+            {'Content-Encoding': content_encoding},
+        )
+    return reader, length, {}
+
+
+def get_spool_dir() -> Path:
+
+    spool_dir = Path(settings.UPLOAD_SPOOL_DIR)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+
+    return spool_dir
+
+
+def spool_stream(stream: BinaryIO, file_uuid: str, file_extension: str) -> tuple[str, int, str]:
+
+    reader = HashingReader(stream)
+    fd, spool_path = tempfile.mkstemp(prefix=file_uuid, suffix=file_extension, dir=get_spool_dir())
+
+    try:
+        with os.fdopen(fd, 'wb') as spool_file:
+            while chunk := reader.read(settings.UPLOAD_CHUNK_SIZE):
+                spool_file.write(chunk)
+    except BaseException:
+        remove_spooled_file(spool_path)
+        raise
+
+    return spool_path, reader.size, reader.hexdigest()
+
+
+def remove_spooled_file(spool_path: str) -> None:
+
+    try:
+        os.unlink(spool_path)
+    except FileNotFoundError:
+        pass
+
+
+def clean_spool_dir(max_age: int) -> int:
+
+    spool_dir = Path(settings.UPLOAD_SPOOL_DIR)
+    if not spool_dir.is_dir():
+        return 0
+
+    removed = 0
+    expired_at = time.time() - max_age
+    for spool_file in spool_dir.iterdir():
+        try:
+            if spool_file.is_file() and spool_file.stat().st_mtime < expired_at:
+                spool_file.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+
+    return removed
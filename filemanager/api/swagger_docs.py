@@ -66,6 +66,21 @@ def show_user_files_detail_swagger_schema():
                 description='Количество записей для отображения на странице. Максимальное значение MaxPageSize устанавливается в filemanager/conf.ini.',
                 type=openapi.TYPE_INTEGER,
             ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                description='Курсор для постраничного вывода без смещения. Пустое значение возвращает первую страницу, '
+                            'значение next_cursor из ответа возвращает следующую. При передаче курсора параметр page игнорируется.',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'count',
+                openapi.IN_QUERY,
+                description='Подсчет total_count: true - точное значение (по умолчанию), false - без подсчета, '
+                            'estimate - подсчет до FILES_COUNT_ESTIMATE_LIMIT записей.',
+                type=openapi.TYPE_STRING,
+                enum=['true', 'false', 'estimate'],
+            ),
         ],
     )
 
@@ -85,6 +100,24 @@ def show_storage_object_detail_swagger_schema():
     )
 
 
+def show_storage_objects_batch_detail_swagger_schema():
+    return swagger_auto_schema(
+        operation_description='Информация о нескольких файлах одним запросом. '
+                              'Идентификаторы передаются повторяющимся параметром file_uuid в GET запросе '
+                              'либо списком file_uuids в теле POST запроса. '
+                              'Для ненайденных файлов в ответе возвращается found: false.',
+        manual_parameters=[
+            openapi.Parameter(
+                'file_uuid',
+                openapi.IN_QUERY,
+                description='Идентификатор файла. Параметр можно передать несколько раз.',
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_UUID,
+            ),
+        ],
+    )
+
+
 def show_user_files_summary_detail_swagger_schema():
     return swagger_auto_schema(
         manual_parameters=[
@@ -99,8 +132,18 @@ def show_user_files_summary_detail_swagger_schema():
     )
 
 
+def show_cache_stats_detail_swagger_schema():
+    return swagger_auto_schema(
+        operation_description='Количество попаданий и промахов кэша ответов и локального кэша скачиваемых файлов (download). '
+                              'Отношение попаданий к общему числу обращений возвращается в поле hit_ratio, '
+                              'объем отданных из кэша файлов в байтах - в поле bytes_served.',
+    )
+
+
 def upload_file_swagger_schema():
     return swagger_auto_schema(
+        operation_description='Загрузка файла телом PUT запроса. Заголовок Content-Length обязателен, '
+                              'запрос без него (chunked) отклоняется со статусом 411.',
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -115,8 +158,60 @@ def upload_file_swagger_schema():
     )
 
 
+def bulk_upload_swagger_schema():
+    return swagger_auto_schema(
+        operation_description='Загрузка нескольких файлов одним multipart запросом. '
+                              'Имя каждой части запроса должно быть uuid файла, '
+                              'расширение файла берется из имени загружаемого файла. '
+                              'В ответе для каждого файла указано, принят ли он к загрузке.',
+    )
+
+
+def initiate_upload_swagger_schema():
+    return swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'parts': openapi.Schema(
+                    type=openapi.TYPE_INTEGER,
+                    description='Количество частей для multipart загрузки. '
+                                'Если не передано, возвращается одна подписанная ссылка для PUT запроса.',
+                ),
+            },
+        )
+    )
+
+
+def complete_upload_swagger_schema():
+    return swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'upload_id': openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    description='Идентификатор multipart загрузки, полученный при инициализации.',
+                ),
+                'parts': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    description='Номера частей и ETag, полученные от MinIO при загрузке каждой части.',
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'part_number': openapi.Schema(type=openapi.TYPE_INTEGER),
+                            'etag': openapi.Schema(type=openapi.TYPE_STRING),
+                        },
+                    ),
+                ),
+            },
+        )
+    )
+
+
 def download_file_swagger_schema():
     return swagger_auto_schema(
+        operation_description='Скачивание файла. Ответ содержит ETag и Last-Modified, готовые файлы не меняются '
+                              'и отдаются с Cache-Control: immutable. На запросы с If-None-Match или '
+                              'If-Modified-Since по неизменившемуся файлу возвращается 304 без обращения к MinIO.',
         manual_parameters=[
             openapi.Parameter(
                 'file_uuid',
@@ -126,6 +221,60 @@ def download_file_swagger_schema():
                 format=openapi.FORMAT_UUID,
                 required=True,
             ),
+            openapi.Parameter(
+                'redirect',
+                openapi.IN_QUERY,
+                description='Перенаправить на временную подписанную ссылку MinIO вместо передачи файла через API. '
+                            'По умолчанию определяется настройкой DOWNLOAD_REDIRECT_SERVICES для сервиса файла.',
+                type=openapi.TYPE_BOOLEAN,
+            ),
+        ]
+    )
+
+
+def download_archive_swagger_schema():
+    return swagger_auto_schema(
+        operation_description='Скачивание готовых файлов пользователя одним ZIP архивом. '
+                              'Архив формируется потоково, файлы отбираются по тем же фильтрам, что и список файлов.',
+        manual_parameters=[
+            openapi.Parameter(
+                'user',
+                openapi.IN_QUERY,
+                description='Идентификатор пользователя файлы которого Вы хотите скачать.',
+                type=openapi.TYPE_INTEGER,
+                required=True,
+            ),
+            openapi.Parameter(
+                'file_uuid',
+                openapi.IN_QUERY,
+                description='Идентификатор файла. Параметр можно передать несколько раз.',
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_UUID,
+            ),
+            openapi.Parameter(
+                'file_extension',
+                openapi.IN_QUERY,
+                description='Перед расширением файла необходимо поставить символ точки (.).',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'service_name',
+                openapi.IN_QUERY,
+                description='Имя сервиса из которого файл был отправлен.',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'start',
+                openapi.IN_QUERY,
+                description='Начальная дата поиска. Дата должна быть записана в формате: YYYY-MM-DD либо YYYY-MM-DD HH:MM:SS.',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'end',
+                openapi.IN_QUERY,
+                description='Конечная дата поиска. Дата должна быть записана в формате: YYYY-MM-DD либо YYYY-MM-DD HH:MM:SS.',
+                type=openapi.TYPE_STRING,
+            ),
         ]
     )
 
@@ -152,6 +301,49 @@ def delete_file_swagger_schema():
     )
 
 
+def bulk_delete_files_swagger_schema():
+    return swagger_auto_schema(
+        operation_description='Отвязка файлов пользователя по списку uuid и/или фильтрам. '
+                              'Файлы, которые больше не доступны ни одному пользователю, удаляются из хранилища.',
+        manual_parameters=[
+            openapi.Parameter(
+                'file_uuid',
+                openapi.IN_QUERY,
+                description='Идентификатор файла. Параметр можно передать несколько раз.',
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_UUID,
+            ),
+            openapi.Parameter(
+                'service_name',
+                openapi.IN_QUERY,
+                description='Имя сервиса из которого файл был отправлен.',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'start',
+                openapi.IN_QUERY,
+                description='Начальная дата поиска. Дата должна быть записана в формате: YYYY-MM-DD либо YYYY-MM-DD HH:MM:SS.',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'end',
+                openapi.IN_QUERY,
+                description='Конечная дата поиска. Дата должна быть записана в формате: YYYY-MM-DD либо YYYY-MM-DD HH:MM:SS.',
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'file_uuids': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID),
+                ),
+            },
+        ),
+    )
+
+
 class BothHttpAndHttpsSchemaGenerator(OpenAPISchemaGenerator):
     def get_schema(self, request=None, public=False):
         schema = super().get_schema(request, public)
@@ -176,9 +368,16 @@ schema_view = get_schema_view(
 __all__ = (
     'show_user_files_detail_swagger_schema',
     'show_storage_object_detail_swagger_schema',
+    'show_storage_objects_batch_detail_swagger_schema',
     'show_user_files_summary_detail_swagger_schema',
+    'show_cache_stats_detail_swagger_schema',
     'upload_file_swagger_schema',
+    'bulk_upload_swagger_schema',
+    'initiate_upload_swagger_schema',
+    'complete_upload_swagger_schema',
     'download_file_swagger_schema',
+    'download_archive_swagger_schema',
     'delete_file_swagger_schema',
+    'bulk_delete_files_swagger_schema',
     'schema_view',
 )
\ No newline at end of file
@@ -1,16 +1,31 @@
 import io
 import os
+import hashlib
+import logging
 import configparser
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
 
 import minio.error
+from minio.deleteobjects import DeleteObject
 import celery
 from celery import shared_task
+from celery.signals import worker_process_init
 from django.conf import settings
+from django import db
 from django.db import transaction
 
-from api.minio_api import get_minio_client
+from api.minio_api import (
+    get_minio_client,
+    ensure_bucket,
+    invalidate_bucket,
+    is_missing_bucket_error,
+    BucketDoesNotExist,
+)
 from api.broker import r_client
-from .models import Storage
+from .models import Storage, StoredObject, release_stored_objects
+from .download_cache import evict_cached_objects
+from .spool import HashingReader, clean_spool_dir, remove_spooled_file, get_content_encoding, wrap_for_storage
 
 MODE = bool(int(settings.DEBUG))
 
@@ -22,6 +37,20 @@ else:
     BUCKET_NAME = os.getenv('BUCKET_NAME')
 
 
+logger = logging.getLogger('Celery')
+
+# Maximum number of keys MinIO accepts in one multi-object delete request.
+REMOVE_OBJECTS_BATCH_SIZE = 1000
+
+
+@worker_process_init.connect
+def prepare_bucket(**kwargs):
+    try:
+        ensure_bucket(get_minio_client(), BUCKET_NAME)
+    except minio.error.MinioException as e:
+        logger.error(f"Bucket {BUCKET_NAME} is not ready: {e}")
+
+
 class CeleryTask(celery.Task):
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         if isinstance(exc, ValueError):
@@ -38,47 +67,231 @@ def send_file_to_storage(file_data: bytes, file_uuid: str, file_extension: str,
         return
 
     minio_client = get_minio_client()
+    ensure_bucket(minio_client, BUCKET_NAME)
+
+    try:
+        _put_file_to_storage(
+            minio_client,
+            io.BytesIO(file_data),
+            len(file_data),
+            file_uuid,
+            file_extension,
+            hashlib.sha256(file_data).hexdigest(),
+        )
+    except BucketDoesNotExist:
+        send_file_to_storage(file_data, file_uuid, file_extension, retries + 1)
+
+
+@shared_task(base=CeleryTask)
+def send_spooled_file_to_storage(
+        spool_path: str,
+        size: int,
+        checksum: str,
+        file_uuid: str,
+        file_extension: str,
+        retries: int = 0,
+):
+
+    if retries > 2:
+        return
+
+    minio_client = get_minio_client()
+    ensure_bucket(minio_client, BUCKET_NAME)
+
+    try:
+        with open(spool_path, 'rb') as spooled_file:
+            _put_file_to_storage(minio_client, spooled_file, size, file_uuid, file_extension, checksum)
+    except FileNotFoundError:
+        _set_file_status(file_uuid, file_extension, 'E')
+    except BucketDoesNotExist:
+        send_spooled_file_to_storage(spool_path, size, checksum, file_uuid, file_extension, retries + 1)
+    finally:
+        remove_spooled_file(spool_path)
 
-    if minio_client.bucket_exists(BUCKET_NAME):
+
+@shared_task(base=CeleryTask)
+def send_spooled_files_to_storage(spooled_files: list[dict]):
+
+    # Files are stored concurrently by the shared MinIO client, whose connection pool
+    # should be at least as large as UPLOAD_BULK_CONCURRENCY.
+    def store_spooled_file(spooled_file: dict):
+        try:
+            send_spooled_file_to_storage(**spooled_file)
+        finally:
+            db.connection.close()
+
+    with ThreadPoolExecutor(max_workers=settings.UPLOAD_BULK_CONCURRENCY) as executor:
+        for future in [executor.submit(store_spooled_file, spooled_file) for spooled_file in spooled_files]:
+            if exc := future.exception():
+                logger.error(f"An error occurred while storing spooled file: {exc}")
+
+
+@shared_task(base=CeleryTask)
+def finalize_file_upload(
+        file_uuid: str,
+        file_extension: str,
+        checksum: Optional[str] = None,
+        size: Optional[int] = None,
+        content_encoding: str = '',
+):
+
+    # File has been written by the API process, only its content reference is left to be set.
+    if checksum is not None:
         with transaction.atomic():
+            stored_object = _acquire_stored_object(
+                get_minio_client(),
+                checksum,
+                file_uuid + file_extension,
+                size,
+                content_encoding,
+            )
+            Storage.objects.filter(file_uuid=file_uuid).update(blob=stored_object)
+
+    _set_file_status(file_uuid, file_extension, 'R')
+
+
+@shared_task(base=CeleryTask)
+def clean_upload_spool():
+
+    return clean_spool_dir(settings.UPLOAD_SPOOL_MAX_AGE)
+
+
+def _put_file_to_storage(
+        minio_client,
+        data: BinaryIO,
+        length: int,
+        file_uuid: str,
+        file_extension: str,
+        checksum: Optional[str] = None,
+):
+
+    with transaction.atomic():
+        try:
+            storage_obj = Storage.objects.get(
+                file_uuid=file_uuid,
+                file_extension=file_extension,
+            )
+        except Storage.DoesNotExist:
+            r_client.send_message(file_uuid, 'error')
+            return
+        else:
+            object_name = file_uuid + file_extension
             try:
-                storage_obj = Storage.objects.get(
-                    file_uuid__iexact=file_uuid,
-                    file_extension__iexact=file_extension,
-                )
-            except Storage.DoesNotExist:
+                # File with the same content is stored already, so only a reference to it is taken.
+                stored_object = StoredObject.acquire_existing(checksum) if checksum is not None else None
+
+                if stored_object is None:
+                    # Checksum and size are calculated over the original content, so compressed
+                    # and raw objects are deduplicated the same way.
+                    reader = HashingReader(data)
+                    content_encoding = get_content_encoding(file_extension)
+                    put_data, put_length, headers = wrap_for_storage(reader, length, content_encoding)
+                    minio_client.put_object(
+                        BUCKET_NAME,
+                        object_name,
+                        put_data,
+                        put_length,
+                        metadata=headers,
+                        part_size=settings.UPLOAD_PART_SIZE,
+                    )
+                    if checksum is not None and reader.hexdigest() != checksum:
+                        minio_client.remove_object(BUCKET_NAME, object_name)
+                        raise ValueError('Checksum of stored file %s does not match.' % object_name)
+                    stored_object = _acquire_stored_object(
+                        minio_client,
+                        reader.hexdigest(),
+                        object_name,
+                        reader.size,
+                        content_encoding,
+                    )
+
+                storage_obj.blob = stored_object
+            except (minio.error.MinioException, ValueError) as exc:
+                if is_missing_bucket_error(exc):
+                    invalidate_bucket(BUCKET_NAME)
+                    raise BucketDoesNotExist(BUCKET_NAME) from exc
                 storage_obj.status = 'E'
-                storage_obj.save()
                 r_client.send_message(file_uuid, 'error')
-                return
             else:
-                try:
-                    bts = io.BytesIO(file_data)
-                    minio_client.put_object(BUCKET_NAME, file_uuid + file_extension, bts, len(file_data))
-                except (minio.error.MinioException, ValueError):
-                    storage_obj.status = 'E'
-                    r_client.send_message(file_uuid, 'error')
-                else:
-                    storage_obj.status = 'R'
-                    r_client.send_message(file_uuid, 'ready')
-                finally:
-                    storage_obj.save()
-    else:
-        minio_client.make_bucket(BUCKET_NAME)
-        send_file_to_storage(file_data, file_uuid, file_extension, retries + 1)
+                storage_obj.status = 'R'
+                r_client.send_message(file_uuid, 'ready')
+            finally:
+                storage_obj.save()
 
 
-@shared_task(base=CeleryTask)
-def remove_file_from_storage(file_uuid: str, file_extension: str, retries: int = 0):
+def _acquire_stored_object(
+        minio_client,
+        checksum: str,
+        object_name: str,
+        size: int,
+        content_encoding: str = '',
+) -> StoredObject:
 
-    if retries > 2:
+    stored_object = StoredObject.acquire(checksum, object_name, size, content_encoding)
+
+    # Same content has been stored under another name before or concurrently,
+    # the object which has just been written is a duplicate.
+    if stored_object.object_name != object_name:
+        try:
+            minio_client.remove_object(BUCKET_NAME, object_name)
+        except minio.error.MinioException as e:
+            logger.error(f"Duplicate object {object_name} has not been removed: {e}")
+
+    return stored_object
+
+
+def _set_file_status(file_uuid: str, file_extension: str, status: str):
+
+    try:
+        storage_obj = Storage.objects.get(
+            file_uuid=file_uuid,
+            file_extension=file_extension,
+        )
+    except Storage.DoesNotExist:
+        r_client.send_message(file_uuid, 'error')
         return
 
-    minio_client = get_minio_client()
+    storage_obj.status = status
+    storage_obj.save()
+    r_client.send_message(file_uuid, 'ready' if status == 'R' else 'error')
+
+
+@shared_task(base=CeleryTask)
+def remove_file_from_storage(file_uuid: str, file_extension: Optional[str] = None):
+
+    # Extension is not used any more, it is kept for tasks which have been queued before.
+
+    object_names = release_stored_objects([file_uuid])
+    evict_cached_objects(object_names)
+    _remove_objects(get_minio_client(), object_names)
+
+
+@shared_task(base=CeleryTask)
+def remove_files_from_storage(file_uuids: list[str]):
+
+    object_names = release_stored_objects(file_uuids)
+    evict_cached_objects(object_names)
+    _remove_objects(get_minio_client(), object_names)
+
+
+def _remove_objects(minio_client, object_names: list[str], retries: int = 0):
 
-    if minio_client.bucket_exists(BUCKET_NAME):
+    if retries > 2:
+        return
 
+    failed = []
+    for start in range(0, len(object_names), REMOVE_OBJECTS_BATCH_SIZE):
+        batch = object_names[start:start + REMOVE_OBJECTS_BATCH_SIZE]
         try:
-            minio_client.remove_object(BUCKET_NAME, file_uuid + file_extension)
-        except minio.error.MinioException:
-            remove_file_from_storage(BUCKET_NAME, file_uuid + file_extension, retries + 1)
\ No newline at end of file
+            # Errors are yielded lazily, so the objects are removed only while iterating.
+            for error in minio_client.remove_objects(BUCKET_NAME, [DeleteObject(name) for name in batch]):
+                logger.error(f"Object {error.name} has not been removed: {error.message}")
+                failed.append(error.name)
+        except minio.error.MinioException as exc:
+            if is_missing_bucket_error(exc):
+                invalidate_bucket(BUCKET_NAME)
+                return
+            failed.extend(batch)
+
+    if failed:
+        _remove_objects(minio_client, failed, retries + 1)
@@ -1,8 +1,36 @@
+import asyncio
+import datetime
+import gzip
+import hashlib
+import io
+import os
 import random
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from unittest import mock
 
-from django.test import TestCase, Client
+import httpx
+import minio.error
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, SimpleTestCase, Client, AsyncClient, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.conf import settings
-from .models import Storage, UserFile
+from .models import Storage, StoredObject, UserStorage, UserFileStats, release_stored_objects
+from .download_cache import open_cached_object, evict_cached_objects
+from .spool import HashingReader, get_content_encoding, wrap_for_storage
+from .utils import accepts_encoding, parse_range_header
+from .cache import get_cache_stats
+from .broker import RedisApi, FILE_STATUS_CHANNEL
+from filemanager import celery_app
+from . import tasks
 
 
 class StorageTestCase(TestCase):
@@ -33,7 +61,7 @@ class StorageTestCase(TestCase):
             else:
                 self.currently_stored_objects_mapped_to_user[user_id].append(storage_obj)
 
-            UserFile.objects.create(
+            UserStorage.objects.create(
                 user_id=user_id,
                 file_id=storage_obj,
             )
@@ -173,3 +201,1333 @@ class StorageTestCase(TestCase):
                 msg='Status code must be 404, got %s' % response.status_code,
             )
 
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class UserFilesQueryCountTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.files_GET = '/api/v1/files/'
+        self.user_id = 1
+
+        for _ in range(30):
+            storage_obj = Storage.objects.create(
+                file_uuid=uuid.uuid4(),
+                file_extension=settings.ALLOWED_FILE_EXTENSIONS[0],
+                service_name=settings.ALLOWED_SERVICE_NAMES[0],
+            )
+            UserStorage.objects.create(
+                user_id=self.user_id,
+                file_id=storage_obj,
+            )
+
+    def __count_queries(self, **params) -> int:
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.files_GET, {'user': self.user_id, **params})
+
+        self.assertEqual(
+            response.status_code,
+            200,
+            msg='Status code must be 200, got %s' % response.status_code,
+        )
+
+        return len(context.captured_queries)
+
+    def test001_list_query_count_does_not_depend_on_page_size(self):
+
+        page_sizes = (1, 10, min(30, settings.MAX_PAGE_SIZE))
+
+        offset_queries = {self.__count_queries(page_size=page_size) for page_size in page_sizes}
+        cursor_queries = {self.__count_queries(page_size=page_size, cursor='') for page_size in page_sizes}
+
+        self.assertEqual(
+            len(offset_queries),
+            1,
+            msg='Number of queries must not grow with page size, got %s' % offset_queries,
+        )
+        self.assertEqual(
+            len(cursor_queries),
+            1,
+            msg='Number of queries must not grow with page size, got %s' % cursor_queries,
+        )
+
+    def test002_filters_are_compiled_into_exact_lookups(self):
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                self.files_GET + '?user=%s&status=P&status=R&file_extension=%s&service_name=%s' % (
+                    self.user_id,
+                    settings.ALLOWED_FILE_EXTENSIONS[0],
+                    settings.ALLOWED_SERVICE_NAMES[0],
+                )
+            )
+
+        self.assertEqual(
+            response.status_code,
+            200,
+            msg='Status code must be 200, got %s' % response.status_code,
+        )
+        self.assertEqual(response.json()['total_count'], 30)
+
+        sql = ' '.join(query['sql'] for query in context.captured_queries).upper()
+
+        self.assertNotIn('LIKE', sql, msg='Filters must not use case-insensitive lookups.')
+        self.assertNotIn('UPPER(', sql, msg='Filters must not wrap columns into functions.')
+        self.assertIn(' IN (', sql, msg='Repeated parameter must be compiled into IN lookup.')
+
+    def test003_batch_lookup_uses_single_query(self):
+
+        file_uuids = [str(file_uuid) for file_uuid in Storage.objects.values_list('file_uuid', flat=True)]
+        missing_uuid = str(uuid.uuid4())
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/v1/files/file/batch/',
+                {'file_uuids': file_uuids + [missing_uuid]},
+                content_type='application/json',
+            )
+
+        self.assertEqual(
+            response.status_code,
+            200,
+            msg='Status code must be 200, got %s' % response.status_code,
+        )
+        self.assertEqual(len(context.captured_queries), 1)
+
+        files = response.json()['files']
+
+        self.assertTrue(all(files[file_uuid]['found'] for file_uuid in file_uuids))
+        self.assertFalse(files[missing_uuid]['found'])
+
+    def test004_cursor_pages_with_tied_and_missing_change_times(self):
+
+        # Records not backfilled by sync_user_files have no time of change, the rest were changed at once.
+        user_files = UserStorage.objects.order_by('file_id_id')
+        UserStorage.objects.filter(pk__in=[user_file.pk for user_file in user_files[:10]]).update(updated_at=None)
+        UserStorage.objects.filter(updated_at__isnull=False).update(updated_at=datetime.datetime(2024, 1, 1))
+
+        file_uuids, cursor, pages = [], '', 0
+        while cursor is not None:
+            response = self.client.get(self.files_GET, {'user': self.user_id, 'page_size': 7, 'cursor': cursor})
+            self.assertEqual(response.status_code, 200, msg=response.content)
+            file_uuids += [file['file_data']['file_uuid'] for file in response.json()['files']]
+            cursor = response.json()['next_cursor']
+            pages += 1
+
+        expected_uuids = [
+            str(file_uuid)
+            for file_uuid in UserStorage.objects.order_by(
+                F('updated_at').desc(nulls_first=True),
+                '-file_id_id',
+            ).values_list('file_id__file_uuid', flat=True)
+        ]
+
+        self.assertEqual(pages, 5)
+        self.assertEqual(file_uuids, expected_uuids)
+        self.assertEqual(len(set(file_uuids)), 30)
+
+    def test005_batch_lookup_rejects_wrong_body(self):
+
+        file_uuids = [str(file_uuid) for file_uuid in Storage.objects.values_list('file_uuid', flat=True)]
+
+        for data in (file_uuids, {'file_uuids': file_uuids[0]}, {}):
+            response = self.client.post('/api/v1/files/file/batch/', data, content_type='application/json')
+            self.assertEqual(response.status_code, 400, msg=data)
+
+    def test006_rows_without_denormalized_columns_are_listed(self):
+
+        # Rows created before denormalization have no copies until sync_user_files has run.
+        UserStorage.objects.filter(user_id=self.user_id).update(
+            file_extension=None,
+            status=None,
+            created_at=None,
+            updated_at=None,
+        )
+
+        for params in ({'page_size': 7}, {'page_size': 7, 'cursor': ''}):
+            response = self.client.get(self.files_GET, {'user': self.user_id, **params})
+
+            self.assertEqual(response.status_code, 200, msg=response.content)
+
+            for file in response.json()['files']:
+                storage_obj = Storage.objects.get(file_uuid=file['file_data']['file_uuid'])
+                self.assertEqual(file['file_data']['file_extension'], storage_obj.file_extension)
+                self.assertEqual(file['file_data']['status'], 'In progress')
+                self.assertIsNotNone(file['file_data']['created_at'])
+                self.assertIsNotNone(file['file_data']['updated_at'])
+                self.assertTrue(file['filename'].endswith(storage_obj.file_extension))
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    FILES_SUMMARY_FROM_STATS=True,
+)
+class UserFileStatsTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.files_summary_GET = '/api/v1/files/summary/'
+        self.user_id = 1
+
+        self.storage_objects = []
+        for file_extension in settings.ALLOWED_FILE_EXTENSIONS * 3:
+            storage_obj = Storage.objects.create(
+                file_uuid=uuid.uuid4(),
+                file_extension=file_extension,
+                service_name=settings.ALLOWED_SERVICE_NAMES[0],
+            )
+            UserStorage.objects.create(
+                user_id=self.user_id,
+                file_id=storage_obj,
+            )
+            self.storage_objects.append(storage_obj)
+
+    def __get_summary(self, **params) -> dict:
+
+        response = self.client.get(self.files_summary_GET, {'user': self.user_id, **params})
+
+        self.assertEqual(
+            response.status_code,
+            200,
+            msg='Status code must be 200, got %s' % response.status_code,
+        )
+
+        return response.json()
+
+    def test001_summary_from_stats_matches_user_files(self):
+
+        self.storage_objects[0].status = 'R'
+        self.storage_objects[0].save()
+        self.storage_objects[1].status = 'E'
+        self.storage_objects[1].save()
+
+        user_file = UserStorage.objects.get(file_id=self.storage_objects[2])
+        user_file.available = False
+        user_file.save()
+
+        today = self.storage_objects[0].created_at.date()
+        tomorrow = today + datetime.timedelta(days=1)
+
+        # Day aligned range is served by the rollup table, a range with time falls back to user files.
+        from_stats = self.__get_summary(start=str(today), end=str(tomorrow))
+        from_user_files = self.__get_summary(start=str(today), end='%s 00:00:01' % tomorrow)
+
+        self.assertEqual(
+            from_stats,
+            from_user_files,
+            msg='Summary built from stats must match summary built from user files.',
+        )
+        self.assertEqual(
+            from_stats['total_count'],
+            len(self.storage_objects) - 1,
+            msg='Unavailable files must not be counted.',
+        )
+
+    def __get_summary_queries(self, **params) -> tuple[dict, str]:
+
+        with CaptureQueriesContext(connection) as context:
+            summary = self.__get_summary(**params)
+
+        return summary, ' '.join(query['sql'] for query in context.captured_queries)
+
+    def test002_summary_without_stats_is_aggregated(self):
+
+        # Counters of files created before the rollup table exist only after rebuild_user_file_stats.
+        UserFileStats.objects.filter(user_id=self.user_id).delete()
+
+        summary, queries = self.__get_summary_queries()
+
+        self.assertEqual(summary['total_count'], len(self.storage_objects))
+        self.assertIn('AS "total_count"', queries, msg='Summary must be aggregated from user files.')
+
+        with override_settings(FILES_SUMMARY_FROM_STATS=False):
+            call_command('rebuild_user_file_stats', stdout=io.StringIO())
+            summary, queries = self.__get_summary_queries()
+
+        self.assertEqual(summary['total_count'], len(self.storage_objects))
+        self.assertNotIn('api_userfilestats', queries)
+
+    def test003_end_of_range_is_counted_the_same_way(self):
+
+        today = self.storage_objects[0].created_at.date()
+        tomorrow = today + datetime.timedelta(days=1)
+        midnight = datetime.datetime.combine(tomorrow, datetime.time.min)
+
+        # File created exactly at the end of the range is included by "created_at <= end".
+        Storage.objects.filter(pk=self.storage_objects[0].pk).update(created_at=midnight)
+        UserStorage.objects.filter(file_id=self.storage_objects[0]).update(created_at=midnight)
+        call_command('rebuild_user_file_stats', stdout=io.StringIO())
+
+        from_stats, stats_queries = self.__get_summary_queries(start=str(today), end=str(tomorrow))
+        from_user_files, user_files_queries = self.__get_summary_queries(start=str(today), end='%s 00:00:01' % tomorrow)
+
+        self.assertIn('api_userfilestats', stats_queries)
+        self.assertNotIn('api_userfilestats', user_files_queries)
+        self.assertEqual(from_stats, from_user_files)
+        self.assertEqual(from_stats['total_count'], len(self.storage_objects))
+
+        day_after = self.__get_summary(start=str(tomorrow), end=str(tomorrow + datetime.timedelta(days=1)))
+
+        self.assertEqual(day_after['total_count'], 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ResponseCacheTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.files_file_GET = '/api/v1/files/file/'
+        self.files_summary_GET = '/api/v1/files/summary/'
+        self.cache_stats_GET = '/api/v1/files/cache/stats/'
+        self.user_id = 1
+
+        self.storage_obj = Storage.objects.create(
+            file_uuid=uuid.uuid4(),
+            file_extension=settings.ALLOWED_FILE_EXTENSIONS[0],
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+        )
+        UserStorage.objects.create(
+            user_id=self.user_id,
+            file_id=self.storage_obj,
+        )
+
+    def tearDown(self):
+
+        cache.clear()
+
+    def __get(self, path: str, **params) -> tuple[dict, int]:
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path, params)
+
+        self.assertEqual(
+            response.status_code,
+            200,
+            msg='Status code must be 200, got %s' % response.status_code,
+        )
+
+        return response.json(), len(context.captured_queries)
+
+    def test001_cached_responses_are_invalidated_on_changes(self):
+
+        file_data, _ = self.__get(self.files_file_GET, file_uuid=str(self.storage_obj.file_uuid))
+        summary, _ = self.__get(self.files_summary_GET, user=self.user_id)
+
+        _, file_queries = self.__get(self.files_file_GET, file_uuid=str(self.storage_obj.file_uuid))
+        _, summary_queries = self.__get(self.files_summary_GET, user=self.user_id)
+
+        self.assertEqual(file_queries + summary_queries, 0, msg='Repeated requests must be served from cache.')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage_obj.status = 'R'
+            self.storage_obj.save()
+
+        new_file_data, _ = self.__get(self.files_file_GET, file_uuid=str(self.storage_obj.file_uuid))
+        new_summary, _ = self.__get(self.files_summary_GET, user=self.user_id)
+
+        self.assertNotEqual(file_data['file_data']['status'], new_file_data['file_data']['status'])
+        self.assertNotEqual(summary, new_summary)
+
+        cache_stats, _ = self.__get(self.cache_stats_GET)
+
+        self.assertEqual(cache_stats['cache_stats']['file_detail']['hits'], 1)
+        self.assertEqual(cache_stats['cache_stats']['file_detail']['misses'], 2)
+        self.assertEqual(cache_stats['cache_stats']['summary']['hit_ratio'], round(1 / 3, 4))
+
+
+class StorageCompressionTestCase(SimpleTestCase):
+
+    @override_settings(STORAGE_COMPRESSED_EXTENSIONS=['.csv'], UPLOAD_CHUNK_SIZE=1024)
+    def test001_compressed_object_keeps_checksum_of_original_content(self):
+
+        content = b''.join(b'%d;user;%d;service\n' % (i, i % 7) for i in range(10000))
+
+        reader = HashingReader(io.BytesIO(content))
+        data, length, headers = wrap_for_storage(reader, len(content), get_content_encoding('.CSV'))
+
+        stored = b''
+        while chunk := data.read(4096):
+            stored += chunk
+
+        self.assertEqual(length, -1)
+        self.assertEqual(headers, {'Content-Encoding': 'gzip'})
+        self.assertEqual(gzip.decompress(stored), content)
+        self.assertLess(len(stored), len(content) // 5)
+        self.assertEqual(reader.size, len(content))
+
+        raw_data, raw_length, raw_headers = wrap_for_storage(io.BytesIO(content), len(content), get_content_encoding('.pdf'))
+
+        self.assertEqual((raw_data.read(), raw_length, raw_headers), (content, len(content), {}))
+
+    def test002_accept_encoding(self):
+
+        factory = RequestFactory()
+        cases = (
+            ('gzip, deflate, br', True),
+            ('br;q=1.0, gzip;q=0.5', True),
+            ('gzip;q=0', False),
+            ('*', True),
+            ('*, gzip;q=0', False),
+            ('identity', False),
+            ('', False),
+        )
+
+        for header, accepted in cases:
+            request = factory.get('/', HTTP_ACCEPT_ENCODING=header)
+            self.assertEqual(accepts_encoding(request, 'gzip'), accepted, msg=header)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    DOWNLOAD_CACHE_MAX_SIZE=0,
+)
+class ConditionalRequestTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.files_file_GET = '/api/v1/files/file/'
+        self.files_file_download_GET = '/api/v1/files/file/download/'
+
+        self.blob = StoredObject.objects.create(
+            checksum='a' * 64,
+            object_name='object.pdf',
+            size=4,
+            ref_count=1,
+        )
+        self.storage_obj = Storage.objects.create(
+            file_uuid=uuid.uuid4(),
+            file_extension='.pdf',
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+            status='R',
+            blob=self.blob,
+        )
+        UserStorage.objects.create(
+            user_id=1,
+            file_id=self.storage_obj,
+        )
+
+    def tearDown(self):
+
+        cache.clear()
+
+    def test001_not_modified_download_does_not_touch_storage(self):
+
+        params = {'file_uuid': str(self.storage_obj.file_uuid), 'redirect': 'false'}
+
+        with mock.patch('api.views.get_minio_client') as get_minio_client:
+            get_minio_client.return_value.get_object.return_value.headers = {'Content-Length': '4'}
+            get_minio_client.return_value.get_object.return_value.stream.return_value = iter([b'data'])
+
+            response = self.client.get(self.files_file_download_GET, params)
+            self.assertEqual(b''.join(response.streaming_content), b'data')
+            self.assertEqual(response['ETag'], '"%s"' % self.blob.checksum)
+            self.assertIn('immutable', response['Cache-Control'])
+
+            get_minio_client.reset_mock()
+
+            for headers in (
+                    {'HTTP_IF_NONE_MATCH': response['ETag']},
+                    {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+            ):
+                not_modified = self.client.get(self.files_file_download_GET, params, **headers)
+
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified['ETag'], response['ETag'])
+                self.assertEqual(not_modified['Cache-Control'], response['Cache-Control'])
+
+            get_minio_client.assert_not_called()
+
+            modified = self.client.get(self.files_file_download_GET, params, HTTP_IF_NONE_MATCH='"%s"' % ('b' * 64))
+            self.assertEqual(modified.status_code, 200)
+
+    def test002_not_modified_file_detail(self):
+
+        params = {'file_uuid': str(self.storage_obj.file_uuid)}
+
+        response = self.client.get(self.files_file_GET, params)
+        not_modified = self.client.get(self.files_file_GET, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage_obj.status = 'E'
+            self.storage_obj.save()
+
+        modified = self.client.get(self.files_file_GET, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(modified.status_code, 200)
+        self.assertNotEqual(modified['ETag'], response['ETag'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DownloadCacheTestCase(SimpleTestCase):
+
+    def setUp(self):
+
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.fetched = []
+
+    def tearDown(self):
+
+        self.cache_dir.cleanup()
+        cache.clear()
+
+    def __fetch(self, content: bytes):
+
+        def fetch():
+            self.fetched.append(content)
+            time.sleep(0.05)
+
+            response = mock.MagicMock()
+            response.stream.return_value = iter([content[:2], content[2:]])
+            return response
+
+        return fetch
+
+    def __read(self, object_name: str, content: bytes, **kwargs) -> bytes:
+
+        cached_object = open_cached_object(object_name, len(content), '', self.__fetch(content), **kwargs)
+        try:
+            return b''.join(cached_object.stream(2))
+        finally:
+            cached_object.close()
+
+    def test001_concurrent_misses_fetch_object_once(self):
+
+        results = []
+        with self.settings(DOWNLOAD_CACHE_DIR=self.cache_dir.name, DOWNLOAD_CACHE_MAX_SIZE=1024):
+            threads = [
+                threading.Thread(target=lambda: results.append(self.__read('object.csv', b'content'))) for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(results, [b'content'] * 8)
+            self.assertEqual(len(self.fetched), 1, msg='Concurrent misses must be coalesced into one fetch.')
+            self.assertEqual(self.__read('object.csv', b'content', offset=3, length=2), b'te')
+
+            stats = get_cache_stats(['download'])['download']
+
+            self.assertEqual((stats['hits'], stats['misses']), (8, 1))
+            self.assertEqual(stats['bytes_served'], 7 * len(b'content') + 2)
+
+            evict_cached_objects(['object.csv'])
+            self.__read('object.csv', b'content')
+
+            self.assertEqual(len(self.fetched), 2)
+
+    def test002_least_recently_used_objects_are_evicted(self):
+
+        with self.settings(DOWNLOAD_CACHE_DIR=self.cache_dir.name, DOWNLOAD_CACHE_MAX_SIZE=25):
+            for object_name in ('first.csv', 'second.csv', 'first.csv', 'third.csv'):
+                self.__read(object_name, b'0123456789')
+                time.sleep(0.01)
+
+            self.__read('first.csv', b'0123456789')
+
+            self.assertEqual(len(self.fetched), 3, msg='Recently used object must stay in cache.')
+
+            self.__read('second.csv', b'0123456789')
+
+            self.assertEqual(len(self.fetched), 4, msg='Least recently used object must be evicted.')
+
+
+class FileStatusMessageTestCase(SimpleTestCase):
+
+    def test001_status_is_stored_before_it_is_published(self):
+
+        file_uuid = str(uuid.uuid4())
+
+        with mock.patch.object(RedisApi, 'get_connection') as get_connection:
+            RedisApi.send_message(file_uuid, 'ready')
+
+        pipeline = get_connection.return_value.pipeline.return_value.__enter__.return_value
+
+        self.assertEqual(
+            pipeline.method_calls,
+            [
+                mock.call.set(file_uuid, 'ready'),
+                mock.call.publish(FILE_STATUS_CHANNEL % file_uuid, 'ready'),
+                mock.call.execute(),
+            ],
+        )
+
+
+class AsyncDownloadRoutingTestCase(TestCase):
+
+    def setUp(self):
+
+        self.files_file_download_async_GET = '/api/v1/files/file/download/async/'
+        self.files_file_download_GET = '/api/v1/files/file/download/'
+
+        self.storage_obj = Storage.objects.create(
+            file_uuid=uuid.uuid4(),
+            file_extension='.pdf',
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+            status='R',
+        )
+        UserStorage.objects.create(
+            user_id=1,
+            file_id=self.storage_obj,
+        )
+
+    def test001_async_views_are_not_routed_under_wsgi(self):
+
+        response = Client().get(self.files_file_download_async_GET, {'file_uuid': str(self.storage_obj.file_uuid)})
+
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(ROOT_URLCONF='filemanager.asgi_urls')
+    async def test002_async_views_are_routed_under_asgi(self):
+
+        http_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, headers={'Content-Length': '4'}, stream=httpx.ByteStream(b'data'))
+            )
+        )
+
+        with mock.patch('api.async_views.get_minio_async_http_client', return_value=http_client), \
+                mock.patch('api.async_views.get_minio_signing_client') as get_minio_signing_client:
+            get_minio_signing_client.return_value.presigned_get_object.return_value = 'http://minio/object.pdf'
+
+            response = await AsyncClient().get(
+                self.files_file_download_async_GET,
+                {'file_uuid': str(self.storage_obj.file_uuid)},
+            )
+            content = b''.join([chunk async for chunk in response.streaming_content])
+
+        await http_client.aclose()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, b'data')
+
+        # Sync views stay on WSGI workers.
+        response = await AsyncClient().get(self.files_file_download_GET, {'file_uuid': str(self.storage_obj.file_uuid)})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class FakePubSub:
+
+    def __init__(self, messages: list[tuple[str, str]]):
+        self.messages = messages
+        self.closed = False
+
+    async def subscribe(self, *channels):
+        self.channels = set(channels)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        if not self.messages:
+            await asyncio.sleep(timeout)
+            return None
+        channel, status = self.messages.pop(0)
+        return {'type': 'message', 'channel': channel.encode(), 'data': status.encode()}
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeAsyncRedis:
+
+    def __init__(self, keys: dict[str, str], messages: list[tuple[str, str]]):
+        self.keys = keys
+        self.pubsub_client = FakePubSub(messages)
+        self.closed = False
+
+    def pubsub(self):
+        return self.pubsub_client
+
+    async def mget(self, keys):
+        return [self.keys[key].encode() if key in self.keys else None for key in keys]
+
+    async def aclose(self):
+        self.closed = True
+
+
+@override_settings(ROOT_URLCONF='filemanager.asgi_urls', FILE_STATUS_WAIT_TIMEOUT=1, FILE_STATUS_KEEPALIVE_INTERVAL=1)
+class FileStatusWaitTestCase(TestCase):
+
+    def setUp(self):
+
+        self.files_file_status_wait_GET = '/api/v1/files/file/status/wait/'
+        self.file_uuids = [str(uuid.uuid4()) for _ in range(3)]
+
+        for file_uuid in self.file_uuids:
+            Storage.objects.create(
+                file_uuid=file_uuid,
+                file_extension='.csv',
+                service_name=settings.ALLOWED_SERVICE_NAMES[0],
+            )
+
+    async def test001_statuses_are_collected_from_keys_messages_and_database(self):
+
+        ready, published, pending = self.file_uuids
+        missing = str(uuid.uuid4())
+        redis_client = FakeAsyncRedis({ready: 'ready'}, [(FILE_STATUS_CHANNEL % published, 'error')])
+
+        with mock.patch.object(RedisApi, 'create_async_connection', return_value=redis_client):
+            response = await AsyncClient().get(
+                self.files_file_status_wait_GET,
+                {'file_uuid': [ready, published, pending, missing]},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['files'],
+            {ready: 'ready', published: 'error', pending: 'in progress', missing: 'not found'},
+        )
+        self.assertTrue(redis_client.pubsub_client.closed and redis_client.closed, msg='Redis client must be closed.')
+
+
+@mock.patch('api.tasks.r_client')
+class StoredObjectReferenceTestCase(TestCase):
+
+    def setUp(self):
+
+        self.minio_client = mock.MagicMock()
+
+    def create_file(self, content: bytes) -> str:
+
+        file_uuid = str(uuid.uuid4())
+        Storage.objects.create(
+            file_uuid=file_uuid,
+            file_extension='.pdf',
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+        )
+        tasks._put_file_to_storage(self.minio_client, io.BytesIO(content), len(content), file_uuid, '.pdf')
+
+        return file_uuid
+
+    def test001_same_content_shares_object(self, r_client):
+
+        first = self.create_file(b'content')
+        second = self.create_file(b'content')
+
+        stored_object = StoredObject.objects.get()
+        self.assertEqual(stored_object.object_name, first + '.pdf')
+        self.assertEqual(stored_object.ref_count, 2)
+        self.assertEqual(Storage.objects.filter(blob=stored_object, status='R').count(), 2)
+
+        # Duplicate has been written under its own name and removed after its reference was taken.
+        self.minio_client.remove_object.assert_called_once_with(tasks.BUCKET_NAME, second + '.pdf')
+
+    def test002_object_is_removed_with_its_last_reference(self, r_client):
+
+        first = self.create_file(b'content')
+        second = self.create_file(b'content')
+
+        self.assertEqual(release_stored_objects([first]), [])
+        self.assertEqual(StoredObject.objects.get().ref_count, 1)
+
+        self.assertEqual(release_stored_objects([second]), [first + '.pdf'])
+        self.assertFalse(StoredObject.objects.exists())
+
+    def test003_file_without_blob_keeps_shared_object(self, r_client):
+
+        # File uploaded by presigned URL is written under its own name and has no reference
+        # until it is completed, while another file with the same content may reuse its object.
+        presigned = str(uuid.uuid4())
+        Storage.objects.create(
+            file_uuid=presigned,
+            file_extension='.pdf',
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+        )
+        stored_object = StoredObject.objects.create(
+            checksum='a' * 64,
+            object_name=presigned + '.pdf',
+            size=7,
+            ref_count=1,
+        )
+        other = str(uuid.uuid4())
+        Storage.objects.create(
+            file_uuid=other,
+            file_extension='.pdf',
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+            blob=stored_object,
+        )
+
+        self.assertEqual(release_stored_objects([presigned]), [])
+        self.assertEqual(StoredObject.objects.get().ref_count, 1)
+
+        self.assertEqual(release_stored_objects([other]), [presigned + '.pdf'])
+        self.assertFalse(StoredObject.objects.exists())
+
+
+@mock.patch('api.views.r_client')
+@mock.patch('api.views.get_minio_presign_client')
+@mock.patch('api.views.ensure_bucket')
+class PresignedUploadTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.file_uuid = str(uuid.uuid4())
+        self.upload_initiate_POST = '/api/v1/files/file/upload/initiate/1/%s/%s/.pdf/' % (
+            settings.ALLOWED_SERVICE_NAMES[0],
+            self.file_uuid,
+        )
+        self.upload_complete_POST = '/api/v1/files/file/upload/complete/%s/' % self.file_uuid
+
+    def test001_multipart_upload_is_completed(self, ensure_bucket, get_minio_presign_client, r_client):
+
+        get_minio_presign_client.return_value.presigned_put_object.return_value = 'url'
+        get_minio_presign_client.return_value.get_presigned_url.return_value = 'url'
+
+        with mock.patch('api.views.get_minio_client') as get_minio_client:
+            minio_client = get_minio_client.return_value
+            minio_client._create_multipart_upload.return_value = 'upload-id'
+
+            response = self.client.post(self.upload_initiate_POST, {'parts': 2}, content_type='application/json')
+
+            self.assertEqual(response.status_code, 200, msg=response.content)
+            self.assertEqual(response.json()['upload_id'], 'upload-id')
+            self.assertEqual([part['part_number'] for part in response.json()['parts']], [1, 2])
+            self.assertEqual(Storage.objects.get(file_uuid=self.file_uuid).status, 'P')
+
+            response = self.client.post(
+                self.upload_complete_POST,
+                {'upload_id': 'upload-id', 'parts': [{'part_number': 1, 'etag': '"a"'}, {'part_number': 2, 'etag': 'b'}]},
+                content_type='application/json',
+            )
+
+            self.assertEqual(response.status_code, 200, msg=response.content)
+            self.assertEqual(Storage.objects.get(file_uuid=self.file_uuid).status, 'R')
+            self.assertEqual(
+                [(part.part_number, part.etag) for part in minio_client._complete_multipart_upload.call_args.args[3]],
+                [(1, 'a'), (2, 'b')],
+            )
+
+            response = self.client.post(self.upload_complete_POST, {}, content_type='application/json')
+
+            self.assertEqual(response.status_code, 409, msg='Only uploads in progress could be completed.')
+
+    def test002_single_upload_prepares_bucket(self, ensure_bucket, get_minio_presign_client, r_client):
+
+        get_minio_presign_client.return_value.presigned_put_object.return_value = 'url'
+        get_minio_presign_client.return_value.get_presigned_url.return_value = 'url'
+
+        with mock.patch('api.views.get_minio_client') as get_minio_client:
+            response = self.client.post(self.upload_initiate_POST, {}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200, msg=response.content)
+        self.assertIn('url', response.json())
+        ensure_bucket.assert_called_once_with(get_minio_client.return_value, mock.ANY)
+        get_minio_client.return_value._create_multipart_upload.assert_not_called()
+
+    def test003_parts_must_be_integer(self, ensure_bucket, get_minio_presign_client, r_client):
+
+        for parts in (True, 1.0, '2', 0, 10001):
+            response = self.client.post(self.upload_initiate_POST, {'parts': parts}, content_type='application/json')
+            self.assertEqual(response.status_code, 400, msg=parts)
+
+        self.assertFalse(Storage.objects.exists())
+
+    def test004_wrong_bodies_are_rejected(self, ensure_bucket, get_minio_presign_client, r_client):
+
+        response = self.client.post(self.upload_initiate_POST, [{'parts': 2}], content_type='application/json')
+
+        self.assertEqual(response.status_code, 400, msg=response.content)
+        self.assertFalse(Storage.objects.exists())
+
+        Storage.objects.create(
+            file_uuid=self.file_uuid,
+            file_extension='.pdf',
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+        )
+
+        with mock.patch('api.views.get_minio_client') as get_minio_client:
+            for data in (
+                    [{'upload_id': 'upload-id'}],
+                    {'upload_id': 1},
+                    {'upload_id': 'upload-id', 'parts': {'part_number': 1, 'etag': 'a'}},
+                    {'upload_id': 'upload-id', 'parts': ['a']},
+                    {'upload_id': 'upload-id', 'parts': [{'part_number': 1, 'etag': 1}]},
+                    {'upload_id': 'upload-id', 'parts': [{'part_number': 'one', 'etag': 'a'}]},
+                    {'upload_id': 'upload-id', 'parts': [{'etag': 'a'}]},
+            ):
+                response = self.client.post(self.upload_complete_POST, data, content_type='application/json')
+                self.assertEqual(response.status_code, 400, msg=data)
+
+            get_minio_client.return_value._complete_multipart_upload.assert_not_called()
+
+        self.assertEqual(Storage.objects.get(file_uuid=self.file_uuid).status, 'P')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+@mock.patch('api.views.remove_files_from_storage')
+class BulkDeleteFilesTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.user_id = 1
+        self.files_bulk_delete_DELETE = '/api/v1/files/file/delete/bulk/%s/' % self.user_id
+
+        self.storage_objects = []
+        for file_extension in settings.ALLOWED_FILE_EXTENSIONS:
+            storage_obj = Storage.objects.create(
+                file_uuid=uuid.uuid4(),
+                file_extension=file_extension,
+                service_name=settings.ALLOWED_SERVICE_NAMES[0],
+            )
+            UserStorage.objects.create(
+                user_id=self.user_id,
+                file_id=storage_obj,
+            )
+            self.storage_objects.append(storage_obj)
+
+        # File shared with another user keeps its object after it is unlinked.
+        UserStorage.objects.create(
+            user_id=self.user_id + 1,
+            file_id=self.storage_objects[0],
+        )
+
+    def __delete(self, query: str = '', data=None):
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.delete(
+                self.files_bulk_delete_DELETE + query,
+                data if data is not None else {},
+                content_type='application/json',
+            )
+
+    def test001_files_are_unlinked_by_filter(self, remove_files_from_storage):
+
+        file_extension = self.storage_objects[1].file_extension
+        response = self.__delete('?file_extension=%s' % file_extension)
+
+        self.assertEqual(response.status_code, 200, msg=response.content)
+        self.assertEqual((response.json()['unlinked'], response.json()['removed']), (1, 1))
+        remove_files_from_storage.delay.assert_called_once_with([str(self.storage_objects[1].file_uuid)])
+        self.assertEqual(
+            UserStorage.objects.filter(user_id=self.user_id, available=True).count(),
+            len(self.storage_objects) - 1,
+        )
+
+    def test002_files_are_unlinked_by_uuids(self, remove_files_from_storage):
+
+        shared, removed = self.storage_objects[:2]
+        response = self.__delete(
+            '?file_uuid=%s' % removed.file_uuid,
+            {'file_uuids': [str(shared.file_uuid)]},
+        )
+
+        self.assertEqual(response.status_code, 200, msg=response.content)
+        self.assertEqual((response.json()['unlinked'], response.json()['removed']), (2, 1))
+        remove_files_from_storage.delay.assert_called_once_with([str(removed.file_uuid)])
+        self.assertTrue(UserStorage.objects.filter(user_id=self.user_id + 1, available=True).exists())
+
+    def test003_wrong_requests_are_rejected(self, remove_files_from_storage):
+
+        for data in ({}, [str(self.storage_objects[0].file_uuid)], {'file_uuids': 'uuid'}, {'file_uuids': ['uuid']}):
+            response = self.__delete(data=data)
+            self.assertEqual(response.status_code, 400, msg=data)
+
+        remove_files_from_storage.delay.assert_not_called()
+        self.assertFalse(UserStorage.objects.filter(available=False).exists())
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    DOWNLOAD_CACHE_MAX_SIZE=0,
+)
+class RangeRequestTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.files_file_download_GET = '/api/v1/files/file/download/'
+        self.content = bytes(range(100))
+
+        self.blob = StoredObject.objects.create(
+            checksum='b' * 64,
+            object_name='object.pdf',
+            size=len(self.content),
+            ref_count=1,
+        )
+        self.storage_obj = Storage.objects.create(
+            file_uuid=uuid.uuid4(),
+            file_extension='.pdf',
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+            status='R',
+            blob=self.blob,
+        )
+
+    def get_object(self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0):
+
+        data = self.content[offset:offset + length] if length else self.content[offset:]
+        response = mock.MagicMock()
+        response.headers = {'Content-Length': str(len(data))}
+        response.stream.return_value = iter([data])
+        return response
+
+    def __download(self, range_header: str, **headers):
+
+        with mock.patch('api.views.get_minio_client') as get_minio_client:
+            get_minio_client.return_value.stat_object.return_value = mock.Mock(size=len(self.content), etag='etag')
+            get_minio_client.return_value.get_object.side_effect = self.get_object
+
+            response = self.client.get(
+                self.files_file_download_GET,
+                {'file_uuid': str(self.storage_obj.file_uuid), 'redirect': 'false'},
+                HTTP_RANGE=range_header,
+                **headers,
+            )
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+
+        return response, content
+
+    def test001_parse_range_header(self):
+
+        cases = (
+            ('bytes=0-99,-100', [(0, 99), (900, 999)]),
+            ('bytes=-100', [(900, 999)]),
+            ('bytes=-2000', [(0, 999)]),
+            ('bytes=900-', [(900, 999)]),
+            ('bytes=500-5000', [(500, 999)]),
+            ('bytes=1000-, -0', []),
+            ('bytes=1000-1999', []),
+            ('bytes=5-1', None),
+            ('bytes=-', None),
+            ('bytes=a-b', None),
+            ('bytes=', None),
+            ('items=0-1', None),
+        )
+
+        for header, ranges in cases:
+            self.assertEqual(parse_range_header(header, 1000), ranges, msg=header)
+
+    def test002_single_ranges(self):
+
+        for range_header, (start, end) in (('bytes=-10', (90, 99)), ('bytes=50-1000', (50, 99)), ('bytes=0-0', (0, 0))):
+            response, content = self.__download(range_header)
+
+            self.assertEqual(response.status_code, 206, msg=range_header)
+            self.assertEqual(response['Content-Range'], 'bytes %s-%s/100' % (start, end))
+            self.assertEqual(int(response['Content-Length']), end - start + 1)
+            self.assertEqual(content, self.content[start:end + 1])
+
+    def test003_multiple_ranges(self):
+
+        response, content = self.__download('bytes=0-9,-10')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertIn(b'Content-Range: bytes 0-9/100', content)
+        self.assertIn(b'Content-Range: bytes 90-99/100', content)
+        self.assertIn(self.content[:10], content)
+        self.assertIn(self.content[90:], content)
+
+    def test004_unsatisfiable_range(self):
+
+        response, _ = self.__download('bytes=100-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test005_whole_file_is_sent_instead_of_ranges(self):
+
+        too_many_ranges = 'bytes=' + ','.join('%s-%s' % (i, i) for i in range(17))
+        etag = '"%s"' % self.blob.checksum
+
+        for range_header, headers in (
+                (too_many_ranges, {}),
+                ('bytes=5-1', {}),
+                ('bytes=0-9', {'HTTP_IF_RANGE': '"other"'}),
+                ('bytes=0-9', {'HTTP_IF_RANGE': 'W/%s' % etag}),
+                ('bytes=0-9', {'HTTP_IF_RANGE': 'Mon, 01 Jan 2001 00:00:00 GMT'}),
+        ):
+            response, content = self.__download(range_header, **headers)
+
+            self.assertEqual(response.status_code, 200, msg=(range_header, headers))
+            self.assertEqual(content, self.content)
+
+        response, content = self.__download('bytes=0-9', HTTP_IF_RANGE=etag)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, self.content[:10])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class DownloadArchiveTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.files_archive_download_GET = '/api/v1/files/archive/download/'
+        self.user_id = 1
+
+        # Content of already compressed formats is random, so it does not shrink when deflated.
+        self.contents = {}
+        for file_extension in ('.pdf', '.csv', '.docx'):
+            storage_obj = Storage.objects.create(
+                file_uuid=uuid.uuid4(),
+                file_extension=file_extension,
+                service_name=settings.ALLOWED_SERVICE_NAMES[0],
+                status='R',
+            )
+            UserStorage.objects.create(
+                user_id=self.user_id,
+                file_id=storage_obj,
+            )
+            self.contents[str(storage_obj.file_uuid) + file_extension] = (
+                b'1;user;export\n' * 10000 if file_extension == '.csv' else random.randbytes(100 * 1024)
+            )
+
+        self.missing_name = str(storage_obj.file_uuid) + storage_obj.file_extension
+
+    def get_object(self, bucket_name: str, object_name: str):
+
+        if object_name == self.missing_name:
+            raise minio.error.MinioException('Object does not exist.')
+
+        response = mock.MagicMock()
+        response.stream.return_value = iter([self.contents[object_name]])
+        return response
+
+    def test001_archive_is_readable(self):
+
+        with mock.patch('api.views.get_minio_client') as get_minio_client:
+            get_minio_client.return_value.get_object.side_effect = self.get_object
+            response = self.client.get(self.files_archive_download_GET, {'user': self.user_id})
+            content = b''.join(response.streaming_content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(
+                sorted(archive.namelist()),
+                sorted(name for name in self.contents if name != self.missing_name),
+            )
+            for entry_info in archive.infolist():
+                # Entries are followed by data descriptors, which readers accept only for deflated data.
+                self.assertEqual(entry_info.compress_type, zipfile.ZIP_DEFLATED, msg=entry_info.filename)
+                self.assertEqual(archive.read(entry_info), self.contents[entry_info.filename])
+
+
+class FakeMinioClient:
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, bucket_name: str, object_name: str, data, length: int, metadata=None, **kwargs):
+        self.objects[object_name] = (data.read() if length < 0 else data.read(length), metadata or {})
+
+    def remove_object(self, bucket_name: str, object_name: str):
+        self.objects.pop(object_name)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class UploadModesTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.minio_client = FakeMinioClient()
+        self.file_uuid = str(uuid.uuid4())
+        self.content = random.randbytes(64 * 1024)
+        self.files_file_upload_PUT = '/api/v1/files/file/upload/1/%s/%s/.pdf/' % (
+            settings.ALLOWED_SERVICE_NAMES[0],
+            self.file_uuid,
+        )
+
+        # Tasks are run by the request itself, MinIO and Redis are replaced in both views and tasks.
+        for name in ('task_always_eager', 'task_eager_propagates'):
+            self.addCleanup(setattr, celery_app.conf, name, getattr(celery_app.conf, name))
+            setattr(celery_app.conf, name, True)
+
+        for patcher in (
+                mock.patch('api.views.get_minio_client', return_value=self.minio_client),
+                mock.patch('api.tasks.get_minio_client', return_value=self.minio_client),
+                mock.patch('api.views.ensure_bucket'),
+                mock.patch('api.tasks.ensure_bucket'),
+                mock.patch('api.views.r_client'),
+                mock.patch('api.tasks.r_client'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def __upload(self):
+
+        response = self.client.put(self.files_file_upload_PUT, self.content, content_type='application/octet-stream')
+
+        self.assertEqual(response.status_code, 200, msg=response.content)
+
+        storage_obj = Storage.objects.select_related('blob').get(file_uuid=self.file_uuid)
+        object_name = self.file_uuid + '.pdf'
+
+        self.assertEqual(storage_obj.status, 'R')
+        self.assertEqual(storage_obj.blob.object_name, object_name)
+        self.assertEqual(storage_obj.blob.checksum, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(storage_obj.blob.size, len(self.content))
+        self.assertEqual(self.minio_client.objects[object_name], (self.content, {}))
+        self.assertTrue(UserStorage.objects.filter(user_id=1, file_id=storage_obj).exists())
+
+    @override_settings(UPLOAD_MODE='stream')
+    def test001_stream_mode(self):
+
+        self.__upload()
+
+    @override_settings(UPLOAD_MODE='celery')
+    def test002_celery_mode(self):
+
+        self.__upload()
+
+    def test003_spool_mode(self):
+
+        with tempfile.TemporaryDirectory() as spool_dir, \
+                override_settings(UPLOAD_MODE='spool', UPLOAD_SPOOL_DIR=spool_dir, UPLOAD_SPOOL_THRESHOLD=1024):
+            self.__upload()
+
+            self.assertEqual(os.listdir(spool_dir), [], msg='Spooled file must be removed after it is stored.')
+
+    def test004_body_without_length_is_rejected(self):
+
+        # Django reads nothing from a chunked body, it must not be stored as an empty file.
+        for upload_mode in ('stream', 'spool', 'celery'):
+            with override_settings(UPLOAD_MODE=upload_mode):
+                response = self.client.put(
+                    self.files_file_upload_PUT,
+                    self.content,
+                    content_type='application/octet-stream',
+                    CONTENT_LENGTH='',
+                    HTTP_TRANSFER_ENCODING='chunked',
+                )
+
+            self.assertEqual(response.status_code, 411, msg=upload_mode)
+
+        self.assertFalse(Storage.objects.exists())
+        self.assertEqual(self.minio_client.objects, {})
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    DOWNLOAD_CACHE_MAX_SIZE=0,
+    DOWNLOAD_CHUNK_SIZE=1024,
+)
+class DownloadStreamingTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.files_file_download_GET = '/api/v1/files/file/download/'
+        self.content = random.randbytes(10 * 1024 + 1)
+
+        self.storage_obj = Storage.objects.create(
+            file_uuid=uuid.uuid4(),
+            file_extension='.pdf',
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+            status='R',
+            blob=StoredObject.objects.create(
+                checksum='c' * 64,
+                object_name='object.pdf',
+                size=len(self.content),
+                ref_count=1,
+            ),
+        )
+
+    def test001_file_is_streamed_by_chunks(self):
+
+        result = mock.MagicMock()
+        result.headers = {'Content-Length': str(len(self.content))}
+        result.stream.side_effect = lambda amt, decode_content: (
+            self.content[start:start + amt] for start in range(0, len(self.content), amt)
+        )
+
+        with mock.patch('api.views.get_minio_client') as get_minio_client:
+            get_minio_client.return_value.get_object.return_value = result
+
+            response = self.client.get(
+                self.files_file_download_GET,
+                {'file_uuid': str(self.storage_obj.file_uuid), 'redirect': 'false'},
+            )
+
+            self.assertTrue(response.streaming)
+            self.assertEqual(int(response['Content-Length']), len(self.content))
+            result.release_conn.assert_not_called()
+
+            chunks = list(response.streaming_content)
+
+        self.assertEqual(b''.join(chunks), self.content)
+        self.assertEqual(len(chunks), 11)
+        result.stream.assert_called_once_with(1024, decode_content=True)
+        result.close.assert_called_once()
+        result.release_conn.assert_called_once()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class BulkUploadTestCase(TestCase):
+
+    def setUp(self):
+
+        self.client = Client()
+        self.files_file_upload_bulk_POST = '/api/v1/files/file/upload/bulk/1/%s/' % settings.ALLOWED_SERVICE_NAMES[0]
+
+        self.existing_uuid = str(uuid.uuid4())
+        Storage.objects.create(
+            file_uuid=self.existing_uuid,
+            file_extension='.pdf',
+            service_name=settings.ALLOWED_SERVICE_NAMES[0],
+        )
+
+    @mock.patch('api.views.send_spooled_files_to_storage')
+    def test001_results_are_reported_per_file(self, send_spooled_files_to_storage):
+
+        pdf_uuid, csv_uuid, exe_uuid, duplicate_uuid = (str(uuid.uuid4()) for _ in range(4))
+        contents = {pdf_uuid: random.randbytes(1024), csv_uuid: b'1;user;export\n' * 100}
+
+        with tempfile.TemporaryDirectory() as spool_dir, override_settings(UPLOAD_SPOOL_DIR=spool_dir):
+            response = self.client.post(self.files_file_upload_bulk_POST, {
+                pdf_uuid: SimpleUploadedFile('report.pdf', contents[pdf_uuid]),
+                csv_uuid: SimpleUploadedFile('report.CSV', contents[csv_uuid]),
+                exe_uuid: SimpleUploadedFile('report.exe', b'data'),
+                duplicate_uuid: [SimpleUploadedFile('first.pdf', b'data'), SimpleUploadedFile('second.pdf', b'data')],
+                self.existing_uuid: SimpleUploadedFile('report.pdf', b'data'),
+                'not-uuid': SimpleUploadedFile('report.pdf', b'data'),
+            })
+
+            self.assertEqual(response.status_code, 200, msg=response.content)
+
+            results = {result['file_uuid']: result for result in response.json()['files']}
+
+            self.assertEqual(
+                {file_uuid: result['accepted'] for file_uuid, result in results.items()},
+                {
+                    pdf_uuid: True,
+                    csv_uuid: True,
+                    exe_uuid: False,
+                    duplicate_uuid: False,
+                    self.existing_uuid: False,
+                    'not-uuid': False,
+                },
+            )
+            self.assertEqual(results[csv_uuid]['file_extension'], '.csv')
+            self.assertEqual(results[duplicate_uuid]['detail'], 'File uuid must be unique within the request.')
+            self.assertEqual(results[self.existing_uuid]['detail'], 'File with uuid %s already exists.' % self.existing_uuid)
+            self.assertEqual(results['not-uuid']['detail'], 'Wrong file uuid format.')
+
+            spooled_files = send_spooled_files_to_storage.delay.call_args.args[0]
+
+            self.assertEqual([spooled_file['file_uuid'] for spooled_file in spooled_files], [pdf_uuid, csv_uuid])
+            for spooled_file in spooled_files:
+                content = contents[spooled_file['file_uuid']]
+                with open(spooled_file['spool_path'], 'rb') as spooled:
+                    self.assertEqual(spooled.read(), content)
+                self.assertEqual(spooled_file['size'], len(content))
+                self.assertEqual(spooled_file['checksum'], hashlib.sha256(content).hexdigest())
+
+        self.assertEqual(
+            set(Storage.objects.filter(status='P').values_list('file_uuid', flat=True)),
+            {uuid.UUID(pdf_uuid), uuid.UUID(csv_uuid), uuid.UUID(self.existing_uuid)},
+        )
+        self.assertEqual(UserStorage.objects.filter(user_id=1).count(), 2)
@@ -11,8 +11,11 @@ urlpatterns = [
     # GET methods
     path('files/', ShowUserFilesDetail.as_view(), name='user-files'),
     path('files/file/', ShowStorageObjectDetail.as_view(), name='user-file'),
+    path('files/file/batch/', ShowStorageObjectsBatchDetail.as_view(), name='user-files-batch'),
     path('files/summary/', ShowUserFilesSummaryDetail.as_view(), name='user-files-summary'),
     path('files/file/download/', DownloadFileView.as_view(), name='download-file'),
+    path('files/archive/download/', DownloadArchiveView.as_view(), name='download-archive'),
+    path('files/cache/stats/', ShowCacheStatsDetail.as_view(), name='cache-stats'),
 
     # PUT methods
     path(
@@ -21,12 +24,34 @@ urlpatterns = [
         name='user-file-upload',
     ),
 
+    # POST methods
+    path(
+        'files/file/upload/bulk/<int:user_id>/<str:from_service>/',
+        BulkUploadUserFilesView.as_view(),
+        name='user-files-bulk-upload',
+    ),
+    path(
+        'files/file/upload/initiate/<int:user_id>/<str:from_service>/<str:file_uuid>/<str:file_extension>/',
+        InitiateUploadView.as_view(),
+        name='user-file-upload-initiate',
+    ),
+    path(
+        'files/file/upload/complete/<str:file_uuid>/',
+        CompleteUploadView.as_view(),
+        name='user-file-upload-complete',
+    ),
+
     # DELETE methods
     path(
         'files/file/delete/<int:user>/<str:file_uuid>/<str:file_extension>/',
         DeleteFileView.as_view(),
         name='delete-file',
     ),
+    path(
+        'files/file/delete/bulk/<int:user>/',
+        BulkDeleteFilesView.as_view(),
+        name='bulk-delete-files',
+    ),
 
     # Docs
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -1,12 +1,50 @@
+import base64
+import binascii
+import calendar
 import datetime
+import json
 import uuid
 from typing import Optional, Any
 
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
 
 from .exceptions import *
 
 
+def normalize_file_uuid(value: str) -> str:
+
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return value
+
+
+def normalize_file_extension(value: str) -> str:
+
+    return value.lower()
+
+
+def normalize_file_identifiers(file_uuid: str, file_extension: str) -> tuple[str, str]:
+
+    # Identifiers from requests are compared with stored ones by plain equality, so they are brought to the stored form.
+    return normalize_file_uuid(file_uuid), normalize_file_extension(file_extension)
+
+
+def normalize_service_name(value: str) -> str:
+
+    service_names = {service_name.lower(): service_name for service_name in settings.ALLOWED_SERVICE_NAMES}
+
+    return service_names.get(value.lower(), value)
+
+
+def normalize_status(value: str) -> str:
+
+    return value.upper()
+
+
 class HttpRequestFilter(type):
 
     # Common filters intended to search accurate values using Django ORM.
@@ -20,6 +58,15 @@ class HttpRequestFilter(type):
         'service_name',
     )
 
+    # Stored values are normalized on write by the same functions,
+    # so common filters are compiled into plain equality or IN lookups which can use column indexes.
+    __common_filter_normalizers = {
+        'file_extension': normalize_file_extension,
+        'file_uuid': normalize_file_uuid,
+        'status': normalize_status,
+        'service_name': normalize_service_name,
+    }
+
     # Timed filters is intended to filter records by the timestamps.
     # Example of usage:
     #       CustomModel.objects.filter(**{'field_gte', value}). Choices are gte, lte.
@@ -67,22 +114,26 @@ class HttpRequestFilter(type):
         return filter_method
 
     @staticmethod
-    def __get_common_filters(self, request) -> dict[str, str]:
+    def __get_common_filters(self, request) -> dict[str, Any]:
 
-        return dict(
-            map(
-                lambda common_filter_list: (
-                    (self._join_to if self._join_to else '') + common_filter_list[0] + '__iexact', common_filter_list[-1]
-                ),
-                filter(
-                    lambda value: value is not None,
-                    (
-                        self.get_filter_list_or_none(request, filter_name)
-                        for filter_name in HttpRequestFilter.__common_filter_names if filter_name in self._allowed_filters
-                    )
-                )
-            )
-        )
+        common_filters = dict()
+        for filter_name in HttpRequestFilter.__common_filter_names:
+            if filter_name not in self._allowed_filters:
+                continue
+
+            normalizer = HttpRequestFilter.__common_filter_normalizers[filter_name]
+            values = sorted({normalizer(value) for value in request.GET.getlist(filter_name) if value})
+
+            if not values:
+                continue
+
+            lookup = self._get_join_prefix(filter_name) + filter_name
+            if len(values) == 1:
+                common_filters[lookup] = values[0]
+            else:
+                common_filters[lookup + '__in'] = values
+
+        return common_filters
 
     @staticmethod
     def __get_timed_filters(self, request) -> dict[str, str]:
@@ -93,7 +144,7 @@ class HttpRequestFilter(type):
                     and (timed_filter_list := self.get_filter_list_or_none(request, timed_filter_name))):
                 operator = '__gte' if timed_filter_name == 'start' else '__lte'
                 timed_filters[
-                    f'{self._join_to if self._join_to else ""}created_at{operator}'
+                    f'{self._get_join_prefix(timed_filter_name)}created_at{operator}'
                 ] = timed_filter_list[-1]
 
         return timed_filters
@@ -116,7 +167,7 @@ class ReqFilter(metaclass=HttpRequestFilter):
 
     __available_request_params = ('GET', 'POST')
 
-    def __init__(self, /, request_param: str, allowed_filters: set, *, request, join_to=None):
+    def __init__(self, /, request_param: str, allowed_filters: set, *, request, join_to=None, local_filters=frozenset()):
 
         assert request_param in self.__available_request_params, (
                 'Unavailable request parameter. Use %s' % ', '.join(self.__available_request_params)
@@ -127,6 +178,14 @@ class ReqFilter(metaclass=HttpRequestFilter):
         self._allowed_filters = allowed_filters
         self.__req = request
         self._join_to = join_to
+        # Filters which are resolved by the model's own (denormalized) columns even though join_to is set.
+        self._local_filters = local_filters
+
+    def _get_join_prefix(self, filter_name: str) -> str:
+
+        if not self._join_to or filter_name in self._local_filters:
+            return ''
+        return self._join_to
 
     @staticmethod
     def get_filter_list_or_none(request, filter_name: str) -> Optional[list[str]]:
@@ -144,6 +203,170 @@ class ReqFilter(metaclass=HttpRequestFilter):
         return {}
 
 
+class Cursor:
+
+    # Opaque pointer to the last record of the page used by keyset pagination.
+    # Example of usage:
+    #       Cursor.encode(updated_at, file_id) -> 'WyIyMDI0LTAxLTAxVDAwOjAwOjAwIiwgNDJd'
+    #       Cursor.decode('WyIyMDI0LTAxLTAxVDAwOjAwOjAwIiwgNDJd') -> (datetime(2024, 1, 1, 0, 0), 42)
+
+    @staticmethod
+    def encode(updated_at: Optional[datetime.datetime], file_id: int) -> str:
+        return base64.urlsafe_b64encode(
+            json.dumps([updated_at.isoformat() if updated_at is not None else None, file_id]).encode()
+        ).decode().rstrip('=')
+
+    @staticmethod
+    def decode(cursor: str) -> tuple[Optional[datetime.datetime], int]:
+        updated_at, file_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.datetime.fromisoformat(updated_at) if updated_at is not None else None, int(file_id)
+
+
+FLAG_VALUES = {'1': True, 'true': True, '0': False, 'false': False}
+
+
+def get_flag(request, name: str, default: bool) -> bool:
+
+    if (value := request.GET.get(name)) is None:
+        return default
+    return FLAG_VALUES.get(value.lower(), default)
+
+
+def get_request_object(request) -> dict:
+
+    # JSON bodies are parsed as they are, so a list or a scalar must be rejected before lookups.
+    if not isinstance(request.data, dict):
+        raise WrongUploadParameters(
+            400,
+            'Request body must be a JSON object.'
+        )
+    return request.data
+
+
+def accepts_encoding(request, encoding: str) -> bool:
+
+    # Checks "Accept-Encoding" header, codings with zero quality are refused explicitly.
+    # Example of usage:
+    #       accepts_encoding(request, 'gzip')  # Accept-Encoding: gzip, br;q=0.5 -> True
+    qualities = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, *params = coding.strip().lower().split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip()] = quality
+
+    return qualities.get(encoding, qualities.get('*', 0.0)) > 0
+
+
+def get_http_timestamp(value: datetime.datetime) -> int:
+
+    # Timestamps are stored in UTC without time zone (USE_TZ = False).
+    return calendar.timegm(value.utctimetuple())
+
+
+def set_cache_headers(
+        response: HttpResponseBase,
+        etag: Optional[str],
+        last_modified: Optional[datetime.datetime],
+        max_age: Optional[int] = None,
+) -> HttpResponseBase:
+
+    # Validators are set always, files which can not change anymore are also marked as immutable.
+    if etag:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(get_http_timestamp(last_modified))
+
+    if max_age is None:
+        patch_cache_control(response, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=max_age, immutable=True)
+
+    return response
+
+
+def get_not_modified_response(
+        request,
+        etag: Optional[str],
+        last_modified: Optional[datetime.datetime],
+        max_age: Optional[int] = None,
+) -> Optional[HttpResponseBase]:
+
+    # Returns "304 Not Modified" (or "412 Precondition Failed") response carrying the same cache headers
+    # as the full one would, None means that the full response has to be built.
+    validators = set_cache_headers(HttpResponse(), etag, last_modified, max_age)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=get_http_timestamp(last_modified) if last_modified is not None else None,
+        response=validators,
+    )
+    return None if response is validators else response
+
+
+def if_range_matches(request, etag: Optional[str], last_modified: Optional[datetime.datetime]) -> bool:
+
+    if not (if_range := request.META.get('HTTP_IF_RANGE')):
+        return True
+
+    # Weak entity tags must never match If-Range.
+    if if_range.startswith('"'):
+        return etag is not None and if_range == etag
+
+    if_range_date = parse_http_date_safe(if_range)
+    return (
+        if_range_date is not None
+        and last_modified is not None
+        and get_http_timestamp(last_modified) == if_range_date
+    )
+
+
+def parse_range_header(header: str, size: int) -> Optional[list[tuple[int, int]]]:
+
+    # Parses "Range" header value into the list of inclusive (start, end) byte positions.
+    # None means that header is malformed and has to be ignored,
+    # empty list means that none of requested ranges is satisfiable.
+    # Example of usage:
+    #       parse_range_header('bytes=0-99,-100', 1000) -> [(0, 99), (900, 999)]
+    units, _, ranges_spec = header.partition('=')
+
+    if units.strip().lower() != 'bytes' or not ranges_spec.strip():
+        return None
+
+    ranges = []
+    for range_spec in ranges_spec.split(','):
+        first, separator, last = range_spec.strip().partition('-')
+
+        if not separator or not (first or last):
+            return None
+        if (first and not first.isdigit()) or (last and not last.isdigit()):
+            return None
+
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and end < start:
+                return None
+        else:
+            suffix_length = int(last)
+            if suffix_length == 0:
+                continue
+            start, end = max(size - suffix_length, 0), size - 1
+
+        if start >= size:
+            continue
+
+        ranges.append((start, min(end, size - 1)))
+
+    return ranges
+
+
 class ParamsChecker:
 
     __available_check_methods = {}
@@ -160,6 +383,9 @@ class ParamsChecker:
             'start': instance.__check_date,
             'end': instance.__check_date,
             'service_name': instance.__check_service,
+            'redirect': instance.__check_flag,
+            'cursor': instance.__check_cursor,
+            'count': instance.__check_count,
         }
 
         return instance
@@ -231,6 +457,34 @@ class ParamsChecker:
                 'Uploading files from not known service is restricted.'
             )
 
+    @staticmethod
+    def __check_flag(value):
+        if value.lower() not in FLAG_VALUES:
+            raise WrongFlagValue(
+                400,
+                'Flag value must be one of: %s.' % ', '.join(FLAG_VALUES)
+            )
+
+    @staticmethod
+    def __check_count(value):
+        if value.lower() not in FLAG_VALUES and value.lower() != 'estimate':
+            raise WrongFlagValue(
+                400,
+                'Count value must be one of: %s, estimate.' % ', '.join(FLAG_VALUES)
+            )
+
+    @staticmethod
+    def __check_cursor(value):
+        if not value:
+            return
+        try:
+            Cursor.decode(value)
+        except (binascii.Error, TypeError, ValueError):
+            raise WrongPaginationValue(
+                400,
+                'Wrong pagination cursor.'
+            )
+
     @staticmethod
     def __check_page(value):
         pass
@@ -1,28 +1,79 @@
 import configparser
+import datetime
+import hashlib
+import io
+import itertools
+import json
 import os
+import uuid
+from collections import Counter
 from typing import Optional
 
 import minio.error
+from minio.datatypes import Object
+from urllib3 import BaseHTTPResponse
 from django.conf import settings
-from django.db.models import Count, Q
-from django.db import transaction, Error
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.utils.encoding import smart_str
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBase, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_datetime
 
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .minio_api import get_minio_client
-
-from .utils import ReqFilter
-from .models import Storage, UserStorage
+from .minio_api import (
+    get_minio_client,
+    get_minio_presign_client,
+    create_multipart_upload,
+    complete_multipart_upload,
+    ensure_bucket,
+    invalidate_bucket,
+    is_missing_bucket_error,
+    ObjectStream,
+    MultipartRangeStream,
+    ZipArchiveStream,
+)
+from .broker import r_client
+
+from .utils import (
+    ReqFilter,
+    Cursor,
+    get_flag,
+    get_request_object,
+    accepts_encoding,
+    if_range_matches,
+    set_cache_headers,
+    get_not_modified_response,
+    parse_range_header,
+    normalize_file_identifiers,
+    normalize_file_extension,
+)
+from .models import Storage, UserStorage, UserFileStats
 from .exceptions import *
-from .serializers import FileSerializer, StorageSerializer
+from .serializers import FileListSerializer, StorageSerializer
 from .middlewares import validate_http_get_params
 from .permissions import *
-from .tasks import send_file_to_storage, remove_file_from_storage
-from .mixins import DeleteFileMixin
+from .tasks import (
+    send_file_to_storage,
+    send_spooled_file_to_storage,
+    send_spooled_files_to_storage,
+    remove_file_from_storage,
+    remove_files_from_storage,
+    finalize_file_upload,
+)
+from .mixins import CreateFileMixin, DeleteFileMixin
+from .download_cache import CachedObject, open_cached_object
+from .spool import HashingReader, spool_stream, remove_spooled_file, get_content_encoding, wrap_for_storage
+from .cache import (
+    bump_user_files_versions,
+    get_or_set_user_files_value,
+    get_or_set_storage_object_value,
+    get_cache_stats,
+)
 from .authentication import CsrfExemptSessionAuthentication
 from .swagger_docs import *
 
@@ -55,6 +106,7 @@ class ShowUserFilesDetail(APIView):
             {'file_extension', 'file_uuid', 'status', 'service_name', 'start', 'end', 'page', 'page_size'},
             request=request,
             join_to='file_id__',
+            local_filters={'file_extension', 'status', 'start', 'end'},
         )
 
         request_filters = req_f.get_filters(request)
@@ -66,9 +118,16 @@ class ShowUserFilesDetail(APIView):
             available=True,
             **request_filters,
         )
-        part_user_files = all_user_files[start_index:end_index]
 
-        serializer = FileSerializer(part_user_files, many=True)
+        user_files_rows = all_user_files.values(*FileListSerializer.values_fields)
+
+        # Keyset pagination is used when "cursor" is passed, empty value requests the first page.
+        if (cursor := request.GET.get('cursor')) is not None:
+            part_user_files, next_cursor = self.__get_cursor_page(user_files_rows, cursor, end_index - start_index)
+        else:
+            part_user_files, next_cursor = user_files_rows[start_index:end_index], None
+
+        serializer = FileListSerializer(part_user_files, many=True)
 
         if not serializer.data:
             raise DataNotFound(
@@ -76,7 +135,64 @@ class ShowUserFilesDetail(APIView):
                 'Requested data not found on server.'
             )
 
-        return Response({'total_count': len(all_user_files), 'user_id': user_id, 'files': serializer.data})
+        response_data = {
+            **self.__count_user_files(request, user_id, request_filters, all_user_files),
+            'user_id': user_id,
+            'files': serializer.data,
+        }
+        if cursor is not None:
+            response_data['next_cursor'] = next_cursor
+
+        return Response(response_data)
+
+    @staticmethod
+    def __count_user_files(request, user_id: str, request_filters: dict, user_files) -> dict:
+
+        match request.GET.get('count', 'true').lower():
+            case 'false' | '0':
+                return {'total_count': None}
+            case 'estimate':
+                # Counting stops at the limit, so heavy users are answered with the lower bound.
+                limit = settings.FILES_COUNT_ESTIMATE_LIMIT
+                total_count = user_files[:limit + 1].count()
+                return {'total_count': min(total_count, limit), 'total_count_exact': total_count <= limit}
+            case _:
+                return {
+                    'total_count': get_or_set_user_files_value(
+                        user_id,
+                        'count',
+                        request_filters,
+                        user_files.count,
+                        settings.FILES_COUNT_CACHE_TIMEOUT,
+                    )
+                }
+
+    @staticmethod
+    def __get_cursor_page(user_files, cursor: str, page_size: int) -> tuple[list[dict], Optional[str]]:
+
+        # Records which have not been backfilled by sync_user_files yet have no time of change. They go first,
+        # which is the order of a backward scan of the index on PostgreSQL, and are paged by file id only.
+        user_files = user_files.order_by(F('updated_at').desc(nulls_first=True), '-file_id_id')
+
+        if cursor:
+            updated_at, file_id = Cursor.decode(cursor)
+            if updated_at is None:
+                user_files = user_files.filter(
+                    Q(updated_at__isnull=True, file_id__lt=file_id) | Q(updated_at__isnull=False)
+                )
+            else:
+                user_files = user_files.filter(
+                    Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, file_id__lt=file_id)
+                )
+
+        # One extra record is fetched to find out whether next page exists.
+        user_files = list(user_files[:page_size + 1])
+
+        if len(user_files) <= page_size:
+            return user_files, None
+
+        last_user_file = user_files[page_size - 1]
+        return user_files[:page_size], Cursor.encode(last_user_file['updated_at'], last_user_file['file_id'])
 
 
 class ShowStorageObjectDetail(APIView):
@@ -102,6 +218,26 @@ class ShowStorageObjectDetail(APIView):
 
         request_filters = req_f.get_filters(request)
 
+        file_data = get_or_set_storage_object_value(
+            file_uuid,
+            'file_detail',
+            lambda: self.__get_file_data(file_uuid, request_filters),
+            settings.FILE_DETAIL_CACHE_TIMEOUT,
+        )
+
+        # Metadata changes together with the status, so it is revalidated on every request
+        # and answered by "304 Not Modified" while it stays the same.
+        etag = '"%s"' % hashlib.sha256(json.dumps(file_data, sort_keys=True, default=str).encode()).hexdigest()
+        last_modified = parse_datetime(file_data['updated_at']) if file_data.get('updated_at') else None
+
+        if not_modified := get_not_modified_response(request, etag, last_modified):
+            return not_modified
+
+        return set_cache_headers(Response({'file_data': file_data}), etag, last_modified)
+
+    @staticmethod
+    def __get_file_data(file_uuid: str, request_filters: dict) -> dict:
+
         try:
             file_info = Storage.objects.get(**request_filters)
         except Storage.DoesNotExist:
@@ -117,7 +253,68 @@ class ShowStorageObjectDetail(APIView):
                 404,
                 'Requested data not found on server.'
             )
-        return Response({'file_data': serializer.data})
+        return dict(serializer.data)
+
+
+class ShowStorageObjectsBatchDetail(APIView):
+    permission_classes = [AllowLookupPermission]
+    authentication_classes = [CsrfExemptSessionAuthentication]
+
+    @show_storage_objects_batch_detail_swagger_schema()
+    @validate_http_get_params
+    def get(self, request) -> Response:
+
+        return self.__get_files_data(request.GET.getlist('file_uuid'))
+
+    @show_storage_objects_batch_detail_swagger_schema()
+    def post(self, request) -> Response:
+
+        file_uuids = get_request_object(request).get('file_uuids')
+
+        if not isinstance(file_uuids, list):
+            raise MissingParameter(
+                400,
+                'Missing parameter "file_uuids".'
+            )
+
+        return self.__get_files_data(file_uuids)
+
+    @staticmethod
+    def __get_files_data(file_uuids: list) -> Response:
+
+        if not file_uuids:
+            raise MissingParameter(
+                400,
+                'Missing parameter "file_uuid".'
+            )
+
+        if len(file_uuids) > settings.FILES_BATCH_MAX_UUIDS:
+            raise WrongPaginationValue(
+                400,
+                'Number of requested files must not exceed %s.' % settings.FILES_BATCH_MAX_UUIDS
+            )
+
+        try:
+            file_uuids = list(dict.fromkeys(str(uuid.UUID(str(file_uuid))) for file_uuid in file_uuids))
+        except ValueError:
+            raise WrongUserIDFormat(
+                400,
+                'Wrong file uuid format.'
+            )
+
+        storage_objects = {
+            str(storage_object.file_uuid): storage_object
+            for storage_object in Storage.objects.filter(file_uuid__in=file_uuids)
+        }
+
+        files_data = {}
+        for file_uuid in file_uuids:
+            if (storage_object := storage_objects.get(file_uuid)) is not None:
+                files_data[file_uuid] = {'found': True, 'file_data': StorageSerializer(storage_object).data}
+            else:
+                files_data[file_uuid] = {'found': False, 'detail': 'File with uuid "%s" does not exist.' % file_uuid}
+
+        return Response({'files': files_data})
 
 
 class ShowUserFilesSummaryDetail(APIView):
@@ -139,6 +336,7 @@ class ShowUserFilesSummaryDetail(APIView):
             {'start', 'end'},
             request=request,
             join_to='file_id__',
+            local_filters={'start', 'end'},
         )
 
         request_filters = req_f.get_filters(request)
@@ -146,22 +344,13 @@ class ShowUserFilesSummaryDetail(APIView):
         file_extensions = settings.ALLOWED_FILE_EXTENSIONS
         statuses = {'R': 'ready', 'E': 'error', 'P': 'in_progress'}
 
-        statuses_dict = {}
-        for file_extension in file_extensions:
-            for status, transcript in statuses.items():
-                statuses_dict['_'.join((file_extension[1:], transcript))] = Count(
-                    'file_id',
-                    filter=Q(file_id__file_extension__iexact=file_extension) & Q(file_id__status__iexact=status)
-                )
-
         try:
-            user_files_count = UserStorage.objects.filter(
-                user_id=user_id,
-                available=True,
-                **request_filters,
-            ).aggregate(
-                total_count=Count('file_id'),
-                **statuses_dict,
+            user_files_count = get_or_set_user_files_value(
+                user_id,
+                'summary',
+                request_filters,
+                lambda: self.__count_user_files(user_id, request_filters, file_extensions, statuses),
+                settings.FILES_SUMMARY_CACHE_TIMEOUT,
             )
             if sum(user_files_count.values()) < 1:
                 raise ObjectDoesNotExist
@@ -176,8 +365,105 @@ class ShowUserFilesSummaryDetail(APIView):
                 **user_files_count
             })
 
+    @classmethod
+    def __count_user_files(cls, user_id, request_filters: dict, file_extensions: list[str], statuses: dict[str, str]) -> dict:
+
+        # Day aligned ranges are answered from the rollup table instead of scanning all user files.
+        # Counters of files created before the table are there only after rebuild_user_file_stats,
+        # so the table is read once it has been enabled and has rows of the user.
+        if (
+                settings.FILES_SUMMARY_FROM_STATS
+                and (stats_filters := cls.__get_stats_filters(request_filters)) is not None
+                and UserFileStats.objects.filter(user_id=user_id).exists()
+        ):
+            return cls.__count_from_stats(user_id, request_filters, stats_filters, file_extensions, statuses)
+        return cls.__count_from_user_files(user_id, request_filters, file_extensions, statuses)
 
-class UploadUserFileView(APIView):
+    @staticmethod
+    def __get_stats_filters(request_filters: dict[str, str]) -> Optional[dict[str, datetime.date]]:
+
+        stats_filters = {}
+        for filter_name, value in request_filters.items():
+            timestamp = datetime.datetime.fromisoformat(value)
+            if timestamp.time() != datetime.time.min:
+                return None
+            # "created_at <= day" includes nothing of that day except its midnight, which is counted separately.
+            lookup = 'day__gte' if filter_name.endswith('__gte') else 'day__lt'
+            stats_filters[lookup] = timestamp.date()
+
+        return stats_filters
+
+    @staticmethod
+    def __count_from_stats(
+            user_id,
+            request_filters: dict,
+            stats_filters: dict,
+            file_extensions: list[str],
+            statuses: dict[str, str],
+    ) -> dict:
+
+        keys = {
+            (normalize_file_extension(file_extension), status): '_'.join((file_extension[1:], transcript))
+            for file_extension in file_extensions
+            for status, transcript in statuses.items()
+        }
+
+        user_files_count = {'total_count': 0, **dict.fromkeys(keys.values(), 0)}
+
+        stats = UserFileStats.objects.filter(
+            user_id=user_id,
+            **stats_filters,
+        ).values('file_extension', 'status').annotate(files_count=Sum('count'))
+
+        # Files created exactly at the end of the range are counted the same way as by user files.
+        created_at_end = [
+            UserStorage.objects.filter(
+                user_id=user_id,
+                available=True,
+                created_at=end,
+            ).values('file_extension', 'status').annotate(files_count=Count('id'))
+            for filter_name, end in request_filters.items() if filter_name.endswith('__lte')
+        ]
+
+        for row in itertools.chain(stats, *created_at_end):
+            user_files_count['total_count'] += row['files_count']
+            if key := keys.get((row['file_extension'], row['status'])):
+                user_files_count[key] += row['files_count']
+
+        return user_files_count
+
+    @staticmethod
+    def __count_from_user_files(user_id, request_filters: dict, file_extensions: list[str], statuses: dict[str, str]) -> dict:
+
+        statuses_dict = {}
+        for file_extension in file_extensions:
+            for status, transcript in statuses.items():
+                statuses_dict['_'.join((file_extension[1:], transcript))] = Count(
+                    'file_id',
+                    filter=Q(file_extension=normalize_file_extension(file_extension)) & Q(status=status)
+                )
+
+        return UserStorage.objects.filter(
+            user_id=user_id,
+            available=True,
+            **request_filters,
+        ).aggregate(
+            total_count=Count('file_id'),
+            **statuses_dict,
+        )
+
+
+class ShowCacheStatsDetail(APIView):
+
+    cached_values = ('count', 'summary', 'file_detail', 'download')
+
+    @show_cache_stats_detail_swagger_schema()
+    def get(self, request) -> Response:
+
+        return Response({'cache_stats': get_cache_stats(self.cached_values)})
+
+
+class UploadUserFileView(APIView, CreateFileMixin):
     permission_classes = [AllowUploadPermission]
     authentication_classes = [CsrfExemptSessionAuthentication]
 
@@ -195,30 +481,97 @@ class UploadUserFileView(APIView):
         if has_error := self.check_file_extensions(file_extension):
             return has_error
 
-        with transaction.atomic():
-            try:
-                storage_object = Storage.objects.create(
-                    file_uuid=file_uuid,
-                    file_extension=file_extension,
-                    service_name=from_service,
-                )
+        file_uuid, file_extension = normalize_file_identifiers(file_uuid, file_extension)
 
-                UserStorage.objects.create(
-                    user_id=user_id,
-                    file_id=storage_object,
-                )
-            except Error:
-                raise DatabaseErrorUpload(
-                    507,
-                    'Server is unable to store the representation.'
-                )
+        length = self.__get_content_length(request)
 
-        send_file_to_storage.delay(request.body, file_uuid, file_extension)
+        storage_object = self._create_file_records(user_id, from_service, file_uuid, file_extension)
+
+        match settings.UPLOAD_MODE:
+            case 'stream':
+                reader, content_encoding = self.__stream_file_to_bucket(request, storage_object, length)
+                finalize_file_upload.delay(file_uuid, file_extension, reader.hexdigest(), reader.size, content_encoding)
+            case 'spool' if length > settings.UPLOAD_SPOOL_THRESHOLD:
+                spool_path, size, checksum = self.__spool_file(request, storage_object)
+                send_spooled_file_to_storage.delay(spool_path, size, checksum, file_uuid, file_extension)
+            case _:
+                send_file_to_storage.delay(request.body, file_uuid, file_extension)
 
         return Response({
             'detail': 'Uploading file %s%s for user with id %s' % (file_uuid, file_extension, user_id)
         })
 
+    @staticmethod
+    def __get_content_length(request) -> int:
+
+        # Django reads nothing from a body without "Content-Length" (chunked transfer encoding),
+        # so such a file would be stored empty.
+        if not (content_length := request.META.get('CONTENT_LENGTH')):
+            raise MissingParameter(
+                411,
+                'Header "Content-Length" is required.'
+            )
+
+        try:
+            return int(content_length)
+        except ValueError:
+            raise WrongUploadParameters(
+                400,
+                'Header "Content-Length" must be an integer.'
+            )
+
+    @staticmethod
+    def __stream_file_to_bucket(request, storage_object: Storage, length: int) -> tuple[HashingReader, str]:
+
+        # Request body is passed to MinIO as a file-like object, so it is read part by part
+        # and never held in memory as a whole. Compressed content has unknown length and is sent by multipart upload.
+        minio_client = get_minio_client()
+        reader = HashingReader(request.stream or io.BytesIO())
+        content_encoding = get_content_encoding(storage_object.file_extension)
+        data, length, headers = wrap_for_storage(reader, length, content_encoding)
+
+        try:
+            ensure_bucket(minio_client, bucket_name)
+            minio_client.put_object(
+                bucket_name,
+                str(storage_object.file_uuid) + storage_object.file_extension,
+                data,
+                length,
+                metadata=headers,
+                part_size=settings.UPLOAD_PART_SIZE,
+                num_parallel_uploads=1,
+            )
+        except (minio.error.MinioException, ValueError, IOError) as exc:
+            if is_missing_bucket_error(exc):
+                invalidate_bucket(bucket_name)
+            storage_object.status = 'E'
+            storage_object.save()
+            r_client.send_message(str(storage_object.file_uuid), 'error')
+            raise FileUploadFailed(
+                507,
+                'Server is unable to store the file in the bucket.'
+            )
+
+        return reader, content_encoding
+
+    @staticmethod
+    def __spool_file(request, storage_object: Storage) -> tuple[str, int, str]:
+
+        try:
+            return spool_stream(
+                request.stream or io.BytesIO(),
+                str(storage_object.file_uuid),
+                storage_object.file_extension,
+            )
+        except OSError:
+            storage_object.status = 'E'
+            storage_object.save()
+            r_client.send_message(str(storage_object.file_uuid), 'error')
+            raise FileUploadFailed(
+                507,
+                'Server is unable to spool the file.'
+            )
+
     @staticmethod
     def check_file_extensions(ext: str) -> Optional[Response]:
 
@@ -231,7 +584,266 @@ class UploadUserFileView(APIView):
             })
 
 
+class BulkUploadUserFilesView(APIView, CreateFileMixin):
+    permission_classes = [AllowPostPermission]
+    authentication_classes = [CsrfExemptSessionAuthentication]
+    parser_classes = [MultiPartParser]
+
+    # Each part of the multipart request is a file: name of the part is the file uuid
+    # and extension is taken from the file name.
+    @bulk_upload_swagger_schema()
+    def post(self, request, user_id: int, from_service: str) -> Response:
+
+        uploaded_files = list(request.FILES.lists())
+
+        if not uploaded_files:
+            raise WrongUploadParameters(
+                400,
+                'Request must contain at least one file.'
+            )
+
+        if len(uploaded_files) > settings.UPLOAD_BULK_MAX_FILES:
+            raise WrongUploadParameters(
+                400,
+                'Number of files in one request must not exceed %s.' % settings.UPLOAD_BULK_MAX_FILES
+            )
+
+        existing_uuids = self.__get_existing_uuids(field_name for field_name, _ in uploaded_files)
+
+        results = []
+        spooled_files = []
+        for field_name, files in uploaded_files:
+            file_uuid, file_extension = normalize_file_identifiers(field_name, os.path.splitext(files[0].name)[1])
+
+            detail = self.__check_file(file_uuid, file_extension, files, existing_uuids)
+
+            if detail is None:
+                try:
+                    spool_path, size, checksum = spool_stream(files[0], file_uuid, file_extension)
+                except OSError:
+                    detail = 'Server is unable to spool the file.'
+                else:
+                    spooled_files.append({
+                        'spool_path': spool_path,
+                        'size': size,
+                        'checksum': checksum,
+                        'file_uuid': file_uuid,
+                        'file_extension': file_extension,
+                    })
+
+            results.append({
+                'file_uuid': file_uuid,
+                'file_extension': file_extension,
+                'accepted': detail is None,
+                'detail': detail or 'Uploading file %s%s' % (file_uuid, file_extension),
+            })
+
+        if spooled_files:
+            try:
+                self._bulk_create_file_records(
+                    user_id,
+                    from_service,
+                    [(spooled_file['file_uuid'], spooled_file['file_extension']) for spooled_file in spooled_files],
+                )
+            except DatabaseErrorUpload:
+                for spooled_file in spooled_files:
+                    remove_spooled_file(spooled_file['spool_path'])
+                raise
+
+            send_spooled_files_to_storage.delay(spooled_files)
+
+        return Response({
+            'detail': 'Uploading %s of %s files for user with id %s' % (len(spooled_files), len(results), user_id),
+            'files': results,
+        })
+
+    @staticmethod
+    def __get_existing_uuids(field_names) -> set[str]:
+
+        file_uuids = []
+        for field_name in field_names:
+            try:
+                file_uuids.append(uuid.UUID(field_name))
+            except ValueError:
+                continue
+
+        return {
+            str(file_uuid) for file_uuid in Storage.objects.filter(
+                file_uuid__in=file_uuids,
+            ).values_list('file_uuid', flat=True)
+        }
+
+    @staticmethod
+    def __check_file(file_uuid: str, file_extension: str, files: list, existing_uuids: set[str]) -> Optional[str]:
+
+        try:
+            uuid.UUID(file_uuid)
+        except ValueError:
+            return 'Wrong file uuid format.'
+
+        if len(files) > 1:
+            return 'File uuid must be unique within the request.'
+
+        if file_extension not in map(normalize_file_extension, settings.ALLOWED_FILE_EXTENSIONS):
+            return 'File extension must belong allowed collection: %s' % settings.ALLOWED_FILE_EXTENSIONS
+
+        if file_uuid in existing_uuids:
+            return 'File with uuid %s already exists.' % file_uuid
+
+        return None
+
+
+class InitiateUploadView(APIView, CreateFileMixin):
+    permission_classes = [AllowPostPermission]
+    authentication_classes = [CsrfExemptSessionAuthentication]
+
+    max_parts = 10000
+
+    @initiate_upload_swagger_schema()
+    def post(
+            self,
+            request,
+            user_id: int,
+            from_service: str,
+            file_uuid: str,
+            file_extension: str,
+    ) -> Response:
+
+        if has_error := UploadUserFileView.check_file_extensions(file_extension):
+            return has_error
+
+        file_uuid, file_extension = normalize_file_identifiers(file_uuid, file_extension)
+
+        parts = get_request_object(request).get('parts')
+
+        if parts is not None and (type(parts) is not int or not 1 <= parts <= self.max_parts):
+            raise WrongUploadParameters(
+                400,
+                'Parameter "parts" must be an integer between 1 and %s.' % self.max_parts
+            )
+
+        storage_object = self._create_file_records(user_id, from_service, file_uuid, file_extension)
+
+        object_name = str(storage_object.file_uuid) + storage_object.file_extension
+        expires = datetime.timedelta(seconds=settings.UPLOAD_PRESIGNED_URL_EXPIRES)
+        presign_client = get_minio_presign_client()
+
+        # Bucket must exist before a client uploads to it, by a single request or by parts.
+        upload_id = self.__prepare_upload(storage_object, object_name, multipart=parts is not None)
+
+        if upload_id is None:
+            return Response({
+                'file_uuid': file_uuid,
+                'url': presign_client.presigned_put_object(bucket_name, object_name, expires=expires),
+            })
+
+        return Response({
+            'file_uuid': file_uuid,
+            'upload_id': upload_id,
+            'parts': [
+                {
+                    'part_number': part_number,
+                    'url': presign_client.get_presigned_url(
+                        'PUT',
+                        bucket_name,
+                        object_name,
+                        expires=expires,
+                        extra_query_params={'uploadId': upload_id, 'partNumber': str(part_number)},
+                    ),
+                }
+                for part_number in range(1, parts + 1)
+            ],
+        })
+
+    @staticmethod
+    def __prepare_upload(storage_object: Storage, object_name: str, multipart: bool) -> Optional[str]:
+
+        minio_client = get_minio_client()
+
+        try:
+            ensure_bucket(minio_client, bucket_name)
+            if multipart:
+                return create_multipart_upload(minio_client, bucket_name, object_name)
+            return None
+        except minio.error.MinioException as exc:
+            if is_missing_bucket_error(exc):
+                invalidate_bucket(bucket_name)
+            storage_object.status = 'E'
+            storage_object.save()
+            r_client.send_message(str(storage_object.file_uuid), 'error')
+            raise FileUploadFailed(
+                507,
+                'Server is unable to initiate upload.'
+            )
+
+
+class CompleteUploadView(APIView):
+    permission_classes = [AllowPostPermission]
+    authentication_classes = [CsrfExemptSessionAuthentication]
+
+    @complete_upload_swagger_schema()
+    def post(self, request, file_uuid: str) -> Response:
+
+        try:
+            storage_object = Storage.objects.get(file_uuid=file_uuid)
+        except (Storage.DoesNotExist, ValidationError):
+            raise ObjectIsNotFound(
+                404,
+                'Object with uuid %s does not exist.' % file_uuid
+            )
+
+        if storage_object.status != 'P':
+            raise InappropriateFileStatus(
+                409,
+                'Only uploads in progress could be completed.'
+            )
+
+        object_name = str(storage_object.file_uuid) + storage_object.file_extension
+        minio_client = get_minio_client()
+
+        request_data = get_request_object(request)
+        upload_id = request_data.get('upload_id')
+
+        if upload_id is not None and not isinstance(upload_id, str):
+            raise WrongUploadParameters(
+                400,
+                'Parameter "upload_id" must be a string.'
+            )
+
+        parts = self.__get_parts(request_data.get('parts', [])) if upload_id else []
+
+        try:
+            if upload_id:
+                complete_multipart_upload(minio_client, bucket_name, object_name, upload_id, parts)
+            minio_client.stat_object(bucket_name, object_name)
+        except minio.error.MinioException:
+            raise ObjectIsNotFound(
+                404,
+                'File %s has not been uploaded to the storage yet.' % object_name
+            )
+
+        storage_object.status = 'R'
+        storage_object.save()
+        r_client.send_message(str(storage_object.file_uuid), 'ready')
+
+        return Response({'detail': 'Upload of file %s has been completed.' % object_name})
+
+    @staticmethod
+    def __get_parts(parts) -> list[tuple[int, str]]:
+
+        try:
+            if not all(isinstance(part, dict) and isinstance(part['etag'], str) for part in parts):
+                raise TypeError
+            return [(int(part['part_number']), part['etag'].strip('"')) for part in parts]
+        except (KeyError, TypeError, ValueError):
+            raise WrongUploadParameters(
+                400,
+                'Parameter "parts" must be a list of objects with "part_number" and "etag".'
+            )
+
+
 class DownloadFileView(APIView, DeleteFileMixin):
+    max_ranges = 16
 
     @download_file_swagger_schema()
     @validate_http_get_params
@@ -246,7 +858,7 @@ class DownloadFileView(APIView, DeleteFileMixin):
             )
 
         try:
-            storage_object = Storage.objects.get(file_uuid=file_uuid)
+            storage_object = Storage.objects.select_related('blob').get(file_uuid=file_uuid)
             if not self._check_for_files_availability(storage_object):
                 raise FileHasBeenRemovedFromFS(
                     404,
@@ -264,18 +876,170 @@ class DownloadFileView(APIView, DeleteFileMixin):
                     'File has %s status. Only files with ready status could be downloaded.' % status
                 )
 
-            file = self.__get_file_from_bucket(storage_object)
-            response = HttpResponse({
-                file,
-            }, content_type='application/octet-stream')
-            response['Content-Disposition'] = f'attachment; filename="{smart_str(str(storage_object.file_uuid) + storage_object.file_extension)}"'
+            response_encoding = self.__get_response_encoding(request, storage_object)
+            etag = storage_object.get_etag(response_encoding)
+
+            # Ready files never change, so clients and caches which hold the file are answered without MinIO.
+            if not_modified := get_not_modified_response(
+                    request,
+                    etag,
+                    storage_object.updated_at,
+                    settings.DOWNLOAD_CACHE_MAX_AGE,
+            ):
+                return self.__set_vary_headers(not_modified, storage_object)
+
+            # MinIO serves compressed objects as they are, so only clients which can decode them are redirected.
+            if (get_flag(request, 'redirect', storage_object.service_name in settings.DOWNLOAD_REDIRECT_SERVICES)
+                    and (not storage_object.content_encoding or response_encoding)):
+                return self.__get_redirect_response(storage_object)
+
+            if storage_object.content_encoding:
+                response = self.__get_encoded_file_response(storage_object, response_encoding)
+            else:
+                response = self.__get_file_response(request, storage_object, etag)
+
+            if response.status_code in (200, 206):
+                set_cache_headers(response, etag, storage_object.updated_at, settings.DOWNLOAD_CACHE_MAX_AGE)
+            return self.__set_vary_headers(response, storage_object)
+
+    @staticmethod
+    def __get_response_encoding(request, storage_object: Storage) -> str:
+
+        # Compressed object is passed through to clients which accept its encoding and decoded for the others.
+        if storage_object.content_encoding and accepts_encoding(request, storage_object.content_encoding):
+            return storage_object.content_encoding
+        return ''
+
+    @staticmethod
+    def __set_vary_headers(response: HttpResponseBase, storage_object: Storage) -> HttpResponseBase:
+
+        if storage_object.content_encoding:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    @staticmethod
+    def __get_redirect_response(storage_object: Storage) -> HttpResponseRedirect:
+
+        # Signing is a local computation, so answering with the redirect does not touch MinIO at all.
+        url = get_minio_presign_client().presigned_get_object(
+            bucket_name,
+            storage_object.object_name,
+            expires=datetime.timedelta(seconds=settings.DOWNLOAD_PRESIGNED_URL_EXPIRES),
+            response_headers={
+                'response-content-type': 'application/octet-stream',
+                'response-content-disposition': f'attachment; filename="{smart_str(str(storage_object.file_uuid) + storage_object.file_extension)}"',
+            },
+        )
+        return HttpResponseRedirect(url)
+
+    def __get_file_response(self, request, storage_object: Storage, etag: Optional[str]) -> HttpResponseBase:
+
+        if range_header := request.META.get('HTTP_RANGE'):
+            stat = self.__get_file_stat(storage_object)
+            # Files stored before deduplication have no checksum, entity tag of the object is used for them.
+            if if_range_matches(request, etag or '"%s"' % stat.etag, storage_object.updated_at):
+                ranges = parse_range_header(range_header, stat.size)
+                if ranges is not None and len(ranges) <= self.max_ranges:
+                    response = self.__get_partial_file_response(storage_object, stat, ranges)
+                    return self.__set_file_headers(response, storage_object)
+
+        result = self.__get_file_from_bucket(storage_object)
+        response = StreamingHttpResponse(
+            ObjectStream(result, settings.DOWNLOAD_CHUNK_SIZE),
+            content_type='application/octet-stream',
+        )
+        if content_length := result.headers.get('Content-Length'):
+            response['Content-Length'] = content_length
+        return self.__set_file_headers(response, storage_object)
+
+    def __get_encoded_file_response(self, storage_object: Storage, response_encoding: str) -> HttpResponseBase:
+
+        # Ranges of the original content can not be mapped onto the compressed object, so the file is sent whole.
+        result = self.__get_file_from_bucket(storage_object)
+        response = StreamingHttpResponse(
+            ObjectStream(result, settings.DOWNLOAD_CHUNK_SIZE, decode_content=not response_encoding),
+            content_type='application/octet-stream',
+        )
+        if response_encoding:
+            response['Content-Encoding'] = response_encoding
+            if content_length := result.headers.get('Content-Length'):
+                response['Content-Length'] = content_length
+        else:
+            response['Content-Length'] = storage_object.blob.size
+
+        self.__set_file_headers(response, storage_object)
+        response['Accept-Ranges'] = 'none'
+        return response
+
+    def __get_partial_file_response(
+            self,
+            storage_object: Storage,
+            stat: Object,
+            ranges: list[tuple[int, int]],
+    ) -> HttpResponseBase:
+
+        if not ranges:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%s' % stat.size
             return response
 
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            result = self.__get_file_from_bucket(storage_object, start, end - start + 1)
+            response = StreamingHttpResponse(
+                ObjectStream(result, settings.DOWNLOAD_CHUNK_SIZE),
+                status=206,
+                content_type='application/octet-stream',
+            )
+            response['Content-Range'] = 'bytes %s-%s/%s' % (start, end, stat.size)
+            response['Content-Length'] = end - start + 1
+            return response
+
+        stream = MultipartRangeStream(
+            lambda offset, length: self.__get_file_from_bucket(storage_object, offset, length),
+            ranges,
+            stat.size,
+            'application/octet-stream',
+            settings.DOWNLOAD_CHUNK_SIZE,
+        )
+        response = StreamingHttpResponse(
+            stream,
+            status=206,
+            content_type='multipart/byteranges; boundary=%s' % stream.boundary,
+        )
+        response['Content-Length'] = stream.content_length
+        return response
+
+    @staticmethod
+    def __set_file_headers(response: HttpResponseBase, storage_object: Storage) -> HttpResponseBase:
+
+        response['Accept-Ranges'] = 'bytes'
+        response['Content-Disposition'] = f'attachment; filename="{smart_str(str(storage_object.file_uuid) + storage_object.file_extension)}"'
+        return response
+
+    @staticmethod
+    def __get_file_stat(storage_object: Storage) -> Object:
+
+        minio_client = get_minio_client()
+
+        try:
+            return minio_client.stat_object(
+                bucket_name=bucket_name,
+                object_name=storage_object.object_name,
+            )
+        except minio.error.MinioException:
+            raise FileHasBeenRemovedFromFS(
+                404,
+                'Requested file has been removed from the file system.'
+            )
+
     @staticmethod
     def __get_file_from_bucket(
             storage_object: Storage,
+            offset: int = 0,
+            length: int = 0,
             retry: int = 0,
-    ) -> bytes:
+    ) -> BaseHTTPResponse | CachedObject:
 
         if retry > 2:
             raise MaxRetriesExceeded(
@@ -285,15 +1049,110 @@ class DownloadFileView(APIView, DeleteFileMixin):
 
         minio_client = get_minio_client()
 
+        # Content of shared objects never changes, so hot files are read from the local disk cache.
+        if retry == 0 and storage_object.blob_id is not None:
+            cached_object = open_cached_object(
+                storage_object.object_name,
+                storage_object.blob.size,
+                storage_object.content_encoding,
+                lambda: minio_client.get_object(bucket_name=bucket_name, object_name=storage_object.object_name),
+                offset,
+                length,
+            )
+            if cached_object is not None:
+                return cached_object
+
         try:
-            result = minio_client.get_object(
+            return minio_client.get_object(
                 bucket_name=bucket_name,
-                object_name=str(storage_object.file_uuid) + storage_object.file_extension,
+                object_name=storage_object.object_name,
+                offset=offset,
+                length=length,
             )
-
-            return result.read()
         except minio.error.MinioException:
-            DownloadFileView.__get_file_from_bucket(storage_object, retry + 1)
+            return DownloadFileView.__get_file_from_bucket(storage_object, offset, length, retry + 1)
+
+
+class DownloadArchiveView(APIView):
+
+    @download_archive_swagger_schema()
+    @validate_http_get_params
+    def get(self, request) -> StreamingHttpResponse:
+
+        user_id = request.GET.get('user')
+
+        if user_id is None:
+            raise MissingParameter(
+                400,
+                'Missing parameter "user".'
+            )
+
+        req_f = ReqFilter(
+            'GET',
+            {'file_extension', 'file_uuid', 'status', 'service_name', 'start', 'end'},
+            request=request,
+            join_to='file_id__',
+            local_filters={'file_extension', 'status', 'start', 'end'},
+        )
+
+        request_filters = req_f.get_filters(request)
+
+        # Only files which have been stored in the bucket can be archived.
+        user_files = list(
+            UserStorage.objects.filter(
+                user_id=user_id,
+                available=True,
+                **request_filters,
+            ).filter(
+                status='R',
+            ).values_list(
+                'file_id__file_uuid', 'file_extension', 'updated_at', 'file_id__blob__object_name',
+            )[:settings.ARCHIVE_MAX_FILES + 1]
+        )
+
+        if not user_files:
+            raise DataNotFound(
+                404,
+                'Requested data not found on server.'
+            )
+
+        if len(user_files) > settings.ARCHIVE_MAX_FILES:
+            raise WrongPaginationValue(
+                400,
+                'Archive can not contain more than %s files.' % settings.ARCHIVE_MAX_FILES
+            )
+
+        entries = []
+        for file_uuid, file_extension, updated_at, object_name in user_files:
+            file_name = str(file_uuid) + file_extension
+            entries.append((file_name, object_name or file_name, updated_at))
+
+        minio_client = get_minio_client()
+
+        response = StreamingHttpResponse(
+            ZipArchiveStream(
+                lambda object_name: self.__open_object(minio_client, object_name),
+                entries,
+                settings.DOWNLOAD_CHUNK_SIZE,
+            ),
+            content_type='application/zip',
+        )
+        response['Content-Disposition'] = 'attachment; filename="files_%s_%s.zip"' % (
+            user_id,
+            datetime.datetime.now().strftime('%Y-%m-%d_%H-%M'),
+        )
+
+        return response
+
+    @staticmethod
+    def __open_object(minio_client, object_name: str) -> Optional[BaseHTTPResponse]:
+
+        try:
+            return minio_client.get_object(bucket_name, object_name)
+        except minio.error.MinioException as exc:
+            if is_missing_bucket_error(exc):
+                invalidate_bucket(bucket_name)
+            return None
 
 
 class DeleteFileView(APIView, DeleteFileMixin):
@@ -302,6 +1161,8 @@ class DeleteFileView(APIView, DeleteFileMixin):
 
     def delete(self, request, user: int, file_uuid: str, file_extension: str):
 
+        file_uuid, file_extension = normalize_file_identifiers(file_uuid, file_extension)
+
         file_to_unlink = UserStorage.objects.filter(user_id=user, file_id__file_uuid=file_uuid).get()
 
         if not file_to_unlink:
@@ -315,17 +1176,113 @@ class DeleteFileView(APIView, DeleteFileMixin):
             file_to_unlink.save()
 
             if not self._check_for_files_availability(file_to_unlink):
-                remove_file_from_storage.delay(file_uuid, file_extension)
+                remove_file_from_storage.delay(file_uuid)
             return Response({'detail': 'Successfully unlinked file %s from user %s.' % (file_uuid, user)})
         else:
             return Response({'detail': 'File with id %s has been already unlinked from user %s' % (file_uuid, user)})
 
 
+class BulkDeleteFilesView(APIView):
+    permission_classes = [AllowDeletePermission]
+    authentication_classes = [CsrfExemptSessionAuthentication]
+
+    @bulk_delete_files_swagger_schema()
+    @validate_http_get_params
+    def delete(self, request, user: int) -> Response:
+
+        req_f = ReqFilter(
+            'GET',
+            {'file_extension', 'status', 'service_name', 'start', 'end'},
+            request=request,
+            join_to='file_id__',
+            local_filters={'file_extension', 'status', 'start', 'end'},
+        )
+
+        request_filters = req_f.get_filters(request)
+
+        if file_uuids := self.__get_file_uuids(request):
+            request_filters['file_id__file_uuid__in'] = file_uuids
+
+        # Without any filter all files of the user would be unlinked.
+        if not request_filters:
+            raise MissingParameter(
+                400,
+                'Either "file_uuids" or at least one filter must be passed.'
+            )
+
+        with transaction.atomic():
+            user_files = list(
+                UserStorage.objects.select_for_update().filter(
+                    user_id=user,
+                    available=True,
+                    **request_filters,
+                ).values_list('id', 'file_id', 'file_extension', 'status', 'created_at')
+            )
+
+            UserStorage.objects.filter(id__in=[user_file[0] for user_file in user_files]).update(available=False)
+
+            deltas = Counter()
+            for _, _, file_extension, status, created_at in user_files:
+                if created_at is not None:
+                    deltas[UserFileStats.make_key(user, file_extension, status, created_at)] -= 1
+            UserFileStats.apply_deltas(deltas)
+
+            # Objects are removed only when no user has the file available any more.
+            orphans = list(
+                Storage.objects.filter(
+                    file_id__in={user_file[1] for user_file in user_files},
+                ).exclude(
+                    userfiles__available=True,
+                ).values_list('file_uuid', flat=True)
+            )
+
+            transaction.on_commit(lambda: bump_user_files_versions([user]))
+            if orphans:
+                transaction.on_commit(lambda: remove_files_from_storage.delay(
+                    [str(file_uuid) for file_uuid in orphans]
+                ))
+
+        return Response({
+            'detail': 'Successfully unlinked %s files from user %s.' % (len(user_files), user),
+            'unlinked': len(user_files),
+            'removed': len(orphans),
+        })
+
+    @staticmethod
+    def __get_file_uuids(request) -> list[str]:
+
+        file_uuids = get_request_object(request).get('file_uuids') or []
+
+        if not isinstance(file_uuids, list):
+            raise WrongUserIDFormat(
+                400,
+                'Parameter "file_uuids" must be a list.'
+            )
+
+        # Uuids may be passed both in the body and as repeated "file_uuid" parameters.
+        file_uuids = file_uuids + request.GET.getlist('file_uuid')
+
+        try:
+            return sorted({str(uuid.UUID(str(file_uuid))) for file_uuid in file_uuids})
+        except ValueError:
+            raise WrongUserIDFormat(
+                400,
+                'Wrong file uuid format.'
+            )
+
+
 __all__ = (
     'ShowUserFilesDetail',
     'ShowStorageObjectDetail',
+    'ShowStorageObjectsBatchDetail',
     'ShowUserFilesSummaryDetail',
+    'ShowCacheStatsDetail',
     'UploadUserFileView',
+    'BulkUploadUserFilesView',
+    'InitiateUploadView',
+    'CompleteUploadView',
     'DownloadFileView',
+    'DownloadArchiveView',
     'DeleteFileView',
+    'BulkDeleteFilesView',
 )
@@ -10,7 +10,11 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'filemanager.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'filemanager.settings.prod')
+# Sync views are left to gunicorn sync workers: under ASGI Django reads their streaming responses
+# into memory before sending and runs all of them in a single thread of the worker.
+os.environ['DJANGO_ROOT_URLCONF'] = 'filemanager.asgi_urls'
 
-application = get_asgi_application()
+application = ASGIStaticFilesHandler(get_asgi_application())
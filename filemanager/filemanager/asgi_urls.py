@@ -0,0 +1,10 @@
+"""
+URL configuration of uvicorn workers.
+
+Only async views are routed here, sync views are served by gunicorn sync workers (see run.sh).
+"""
+from django.urls import path, include
+
+urlpatterns = [
+    path('api/v1/', include('api.async_urls', namespace='api')),
+]
@@ -9,3 +9,10 @@ app = Celery('filemanager')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 app.autodiscover_tasks()
+
+app.conf.beat_schedule = {
+    'clean-upload-spool': {
+        'task': 'api.tasks.clean_upload_spool',
+        'schedule': 60 * 60,
+    },
+}
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -30,7 +31,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'filemanager.urls'
+# Uvicorn workers route only async views (see filemanager/asgi.py and run.sh).
+ROOT_URLCONF = os.getenv('DJANGO_ROOT_URLCONF', 'filemanager.urls')
 
 TEMPLATES = [
     {
@@ -39,6 +39,66 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = int(config['DEPLOY MODE']['DataUploadMaxMemorySize
 CORS_ALLOWED_ORIGINS = config['DEPLOY MODE']['CORSAllowedOrigins'].split('\n')
 ALLOWED_HOSTS = config['DEPLOY MODE']['AllowedHosts'].split('\n')
 
+# MinIO client configuration
+
+MINIO_POOL_MAXSIZE = int(config['MinIO'].get('PoolMaxSize', 10))
+MINIO_CONNECT_TIMEOUT = float(config['MinIO'].get('ConnectTimeout', 5))
+MINIO_READ_TIMEOUT = float(config['MinIO'].get('ReadTimeout', 5 * 60))
+MINIO_MAX_RETRIES = int(config['MinIO'].get('MaxRetries', 5))
+
+# Cache configuration
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://%s:%s/%s' % (
+            config['MESSAGE BROKER']['REDIS_HOST'],
+            config['MESSAGE BROKER']['REDIS_PORT'],
+            config['MESSAGE BROKER'].get('REDIS_CACHE_DB', config['MESSAGE BROKER']['REDIS_DB']),
+        ),
+        'OPTIONS': {
+            'password': config['MESSAGE BROKER']['REDIS_PASSWORD'] or None,
+        },
+        'KEY_PREFIX': 'filemanager',
+    }
+}
+
+FILES_COUNT_CACHE_TIMEOUT = int(config['DEPLOY MODE'].get('FilesCountCacheTimeout', 5 * 60))
+FILES_COUNT_ESTIMATE_LIMIT = int(config['DEPLOY MODE'].get('FilesCountEstimateLimit', 10000))
+FILES_SUMMARY_CACHE_TIMEOUT = int(config['DEPLOY MODE'].get('FilesSummaryCacheTimeout', 60 * 60))
+FILES_SUMMARY_FROM_STATS = bool(int(config['DEPLOY MODE'].get('FilesSummaryFromStats', 0)))
+FILE_DETAIL_CACHE_TIMEOUT = int(config['DEPLOY MODE'].get('FileDetailCacheTimeout', 60 * 60))
+
+# Uploads configuration
+
+UPLOAD_MODE = config['DEPLOY MODE'].get('UploadMode', 'celery')
+UPLOAD_PART_SIZE = int(config['DEPLOY MODE'].get('UploadPartSize', 10 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = int(config['DEPLOY MODE'].get('UploadChunkSize', 64 * 1024))
+UPLOAD_SPOOL_DIR = config['DEPLOY MODE'].get('UploadSpoolDir', str(BASE_DIR / 'spool'))
+UPLOAD_SPOOL_THRESHOLD = int(config['DEPLOY MODE'].get('UploadSpoolThreshold', 256 * 1024))
+UPLOAD_SPOOL_MAX_AGE = int(config['DEPLOY MODE'].get('UploadSpoolMaxAge', 24 * 60 * 60))
+UPLOAD_PRESIGNED_URL_EXPIRES = int(config['DEPLOY MODE'].get('UploadPresignedUrlExpires', 60 * 60))
+UPLOAD_BULK_MAX_FILES = int(config['DEPLOY MODE'].get('UploadBulkMaxFiles', 100))
+DATA_UPLOAD_MAX_NUMBER_FILES = UPLOAD_BULK_MAX_FILES
+UPLOAD_BULK_CONCURRENCY = int(config['DEPLOY MODE'].get('UploadBulkConcurrency', 8))
+STORAGE_COMPRESSED_EXTENSIONS = list(filter(None, config['DEPLOY MODE'].get('StorageCompressedExtensions', '.csv').split('\n')))
+STORAGE_COMPRESSION_LEVEL = int(config['DEPLOY MODE'].get('StorageCompressionLevel', 6))
+
+# Downloads configuration
+
+DOWNLOAD_CHUNK_SIZE = int(config['DEPLOY MODE'].get('DownloadChunkSize', 64 * 1024))
+DOWNLOAD_REDIRECT_SERVICES = list(filter(None, config['DEPLOY MODE'].get('DownloadRedirectServices', '').split('\n')))
+DOWNLOAD_PRESIGNED_URL_EXPIRES = int(config['DEPLOY MODE'].get('DownloadPresignedUrlExpires', 5 * 60))
+DOWNLOAD_CACHE_MAX_AGE = int(config['DEPLOY MODE'].get('DownloadCacheMaxAge', 365 * 24 * 60 * 60))
+DOWNLOAD_CACHE_DIR = config['DEPLOY MODE'].get('DownloadCacheDir', str(BASE_DIR / 'download_cache'))
+DOWNLOAD_CACHE_MAX_SIZE = int(config['DEPLOY MODE'].get('DownloadCacheMaxSize', 1024 * 1024 * 1024))
+DOWNLOAD_CACHE_MAX_OBJECT_SIZE = int(config['DEPLOY MODE'].get('DownloadCacheMaxObjectSize', 64 * 1024 * 1024))
+ARCHIVE_MAX_FILES = int(config['DEPLOY MODE'].get('ArchiveMaxFiles', 1000))
+
 # Common configurations
 
 MAX_PAGE_SIZE = int(config['DEPLOY MODE']['MaxPageSize'])
+FILES_BATCH_MAX_UUIDS = int(config['DEPLOY MODE'].get('FilesBatchMaxUuids', 1000))
+FILE_STATUS_WAIT_TIMEOUT = int(config['DEPLOY MODE'].get('FileStatusWaitTimeout', 30))
+FILE_STATUS_EVENTS_TIMEOUT = int(config['DEPLOY MODE'].get('FileStatusEventsTimeout', 5 * 60))
+FILE_STATUS_KEEPALIVE_INTERVAL = int(config['DEPLOY MODE'].get('FileStatusKeepaliveInterval', 15))
@@ -37,6 +37,66 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('DATA_UPLOAD_MAX_MEMORY_SIZE'))
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS').split(',')
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS').split(',')
 
+# MinIO client configuration
+
+MINIO_POOL_MAXSIZE = int(os.getenv('MINIO_POOL_MAXSIZE', 10))
+MINIO_CONNECT_TIMEOUT = float(os.getenv('MINIO_CONNECT_TIMEOUT', 5))
+MINIO_READ_TIMEOUT = float(os.getenv('MINIO_READ_TIMEOUT', 5 * 60))
+MINIO_MAX_RETRIES = int(os.getenv('MINIO_MAX_RETRIES', 5))
+
+# Cache configuration
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://%s:%s/%s' % (
+            os.getenv('REDIS_HOST'),
+            os.getenv('REDIS_PORT'),
+            os.getenv('REDIS_CACHE_DB', os.getenv('REDIS_DB')),
+        ),
+        'OPTIONS': {
+            'password': os.getenv('REDIS_PASSWORD') or None,
+        },
+        'KEY_PREFIX': 'filemanager',
+    }
+}
+
+FILES_COUNT_CACHE_TIMEOUT = int(os.getenv('FILES_COUNT_CACHE_TIMEOUT', 5 * 60))
+FILES_COUNT_ESTIMATE_LIMIT = int(os.getenv('FILES_COUNT_ESTIMATE_LIMIT', 10000))
+FILES_SUMMARY_CACHE_TIMEOUT = int(os.getenv('FILES_SUMMARY_CACHE_TIMEOUT', 60 * 60))
+FILES_SUMMARY_FROM_STATS = bool(int(os.getenv('FILES_SUMMARY_FROM_STATS', 0)))
+FILE_DETAIL_CACHE_TIMEOUT = int(os.getenv('FILE_DETAIL_CACHE_TIMEOUT', 60 * 60))
+
+# Uploads configuration
+
+UPLOAD_MODE = os.getenv('UPLOAD_MODE', 'celery')
+UPLOAD_PART_SIZE = int(os.getenv('UPLOAD_PART_SIZE', 10 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 64 * 1024))
+UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', '/tmp/filemanager/spool')
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv('UPLOAD_SPOOL_THRESHOLD', 256 * 1024))
+UPLOAD_SPOOL_MAX_AGE = int(os.getenv('UPLOAD_SPOOL_MAX_AGE', 24 * 60 * 60))
+UPLOAD_PRESIGNED_URL_EXPIRES = int(os.getenv('UPLOAD_PRESIGNED_URL_EXPIRES', 60 * 60))
+UPLOAD_BULK_MAX_FILES = int(os.getenv('UPLOAD_BULK_MAX_FILES', 100))
+DATA_UPLOAD_MAX_NUMBER_FILES = UPLOAD_BULK_MAX_FILES
+UPLOAD_BULK_CONCURRENCY = int(os.getenv('UPLOAD_BULK_CONCURRENCY', 8))
+STORAGE_COMPRESSED_EXTENSIONS = list(filter(None, os.getenv('STORAGE_COMPRESSED_EXTENSIONS', '.csv').split(',')))
+STORAGE_COMPRESSION_LEVEL = int(os.getenv('STORAGE_COMPRESSION_LEVEL', 6))
+
+# Downloads configuration
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', 64 * 1024))
+DOWNLOAD_REDIRECT_SERVICES = list(filter(None, os.getenv('DOWNLOAD_REDIRECT_SERVICES', '').split(',')))
+DOWNLOAD_PRESIGNED_URL_EXPIRES = int(os.getenv('DOWNLOAD_PRESIGNED_URL_EXPIRES', 5 * 60))
+DOWNLOAD_CACHE_MAX_AGE = int(os.getenv('DOWNLOAD_CACHE_MAX_AGE', 365 * 24 * 60 * 60))
+DOWNLOAD_CACHE_DIR = os.getenv('DOWNLOAD_CACHE_DIR', '/tmp/filemanager/download_cache')
+DOWNLOAD_CACHE_MAX_SIZE = int(os.getenv('DOWNLOAD_CACHE_MAX_SIZE', 1024 * 1024 * 1024))
+DOWNLOAD_CACHE_MAX_OBJECT_SIZE = int(os.getenv('DOWNLOAD_CACHE_MAX_OBJECT_SIZE', 64 * 1024 * 1024))
+ARCHIVE_MAX_FILES = int(os.getenv('ARCHIVE_MAX_FILES', 1000))
+
 # Common configurations
 
 MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE'))
+FILES_BATCH_MAX_UUIDS = int(os.getenv('FILES_BATCH_MAX_UUIDS', 1000))
+FILE_STATUS_WAIT_TIMEOUT = int(os.getenv('FILE_STATUS_WAIT_TIMEOUT', 30))
+FILE_STATUS_EVENTS_TIMEOUT = int(os.getenv('FILE_STATUS_EVENTS_TIMEOUT', 5 * 60))
+FILE_STATUS_KEEPALIVE_INTERVAL = int(os.getenv('FILE_STATUS_KEEPALIVE_INTERVAL', 15))
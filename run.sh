@@ -1,3 +1,14 @@
 #!/bin/bash
 
-cd filemanager && celery -A filemanager worker --loglevel=info & cd filemanager && gunicorn --workers=7 filemanager.wsgi --access-logfile '-' --bind 0.0.0.0:8000
\ No newline at end of file
+cd filemanager && celery -A filemanager worker --beat --loglevel=info &
+
+# Sync views are always served by gunicorn sync workers. Under ASGI Django reads their streaming
+# responses (downloads, archives) into memory before sending and runs them one at a time per worker.
+# ASGI mode (default of the image) additionally starts uvicorn workers on ASGI_PORT which route only
+# async views (filemanager/asgi_urls.py). The proxy sends their paths to that port (see k8s/ingerss.yaml),
+# with SERVER_MODE=wsgi these endpoints do not exist.
+if [ "$SERVER_MODE" = "asgi" ]; then
+  (cd filemanager && gunicorn --workers="${ASGI_WORKERS:-2}" --worker-class uvicorn.workers.UvicornWorker filemanager.asgi:application --access-logfile '-' --bind 0.0.0.0:"${ASGI_PORT:-8001}") &
+fi
+
+cd filemanager && gunicorn --workers=7 filemanager.wsgi --access-logfile '-' --bind 0.0.0.0:8000